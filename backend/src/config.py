@@ -3,7 +3,7 @@ Configuration settings for the FastAPI application
 """
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict, Any
 from dotenv import load_dotenv
 import os
 
@@ -22,24 +22,74 @@ class Settings(BaseSettings):
     # CORS Configuration
     cors_origins: list = ["*"]
 
+    # Local expense store (append-only log of every expense written)
+    expense_store_path: str = os.getenv("EXPENSE_STORE_PATH", "./backend/data/expenses.jsonl")
+
+    # Monthly budgets, as JSON maps, e.g. CATEGORY_BUDGETS='{"food": 8000}'
+    category_budgets: Dict[str, float] = {}
+    importance_budgets: Dict[str, float] = {}
+
+    # Tenants served by this deployment, as a JSON map of tenant id to
+    # {"notion_token", "notion_database_id", "api_key", optional budgets}.
+    # Requests authenticate with the tenant's key in the X-API-Key header.
+    # The top-level Notion settings above form the default tenant, which is
+    # open to requests without a key unless DEFAULT_TENANT_API_KEY is set.
+    tenants: Dict[str, Dict[str, Any]] = {}
+    default_tenant_id: str = "default"
+    default_tenant_api_key: Optional[str] = os.getenv("DEFAULT_TENANT_API_KEY")
+
+    # Outbound Notion scheduling (Notion allows ~3 requests/s per integration)
+    notion_requests_per_second: float = 3.0
+    notion_burst: int = 3
+    notion_max_concurrency: int = 8
+    notion_tenant_concurrency: int = 2
+
+    # Recurring expenses: how often to materialize due occurrences, and how
+    # many to write per tenant per run (the rest catch up on the next run)
+    recurring_check_interval_seconds: int = 3600
+    recurring_batch_size: int = 20
+
+    # Offline-first mode: writes go to a local SQLite store and are replicated to
+    # Notion in the background; edits made in Notion are pulled back
+    offline_first: bool = False
+    notion_sync_interval_seconds: int = 30
+    notion_pull_interval_seconds: int = 300
+    notion_sync_batch_size: int = 20
+
+    # Timezone for "today" and relative dates in expense text
+    timezone: str = "Asia/Kolkata"
+
+    # Record chat expenses parsed unambiguously by the local parser without calling the LLM
+    local_parse_first: bool = False
+
+    # Profiling (all off by default). Requests can be profiled when they send
+    # an X-Profile header, by random sampling, or automatically when slower
+    # than the threshold; reports are served from the admin API.
+    profiling_header_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_slow_request_ms: float = 0.0
+    profiling_sample_interval_ms: float = 10.0
+    profiling_max_reports: int = 50
+
+    # Required in the X-Admin-Token header for /api/v1/admin; admin API is off when unset
+    admin_token: Optional[str] = os.getenv("ADMIN_TOKEN")
+
 settings = Settings()
 
 from src.models import ExpenseCategory, ExpenseImportance, BankAccount, ExpenseType
-from datetime import datetime
 import os
 class LLMConfig:
     """Configuration for the LLM service"""
     api_key: str = os.getenv("OPENAI_API_KEY")
-    current_date = datetime.now().strftime('%Y-%m-%d')
     categories = [c.value for c in ExpenseCategory]
     importances = [i.value for i in ExpenseImportance]
     bank_accounts = [b.value for b in BankAccount]
     expense_types = [e.value for e in ExpenseType]
 
-    SYSTEM_PROMPT = f"""
+    SYSTEM_PROMPT_TEMPLATE = """
 You are a personal finance assistant for expense tracking.
 
-Today's date is {current_date} (format: YYYY-MM-DD, timezone: Asia/Kolkata).
+Today's date is {current_date} (format: YYYY-MM-DD, timezone: {timezone}).
 
 Your job is to extract a structured record for each new expense from a user's natural language message.
 Strictly follow these instructions:
@@ -64,4 +114,16 @@ Only use values from above enums. Output as single JSON object matching this sch
     "assigned_date": "<YYYY-MM-DD>",
     "expense_type": "<expense/income>"
 }}
-    """
\ No newline at end of file
+    """
+
+    def __init__(self):
+        # Imported here: the extraction service itself depends on settings above
+        from src.services.extraction_service import local_today
+        self.current_date = local_today().isoformat()
+        self.SYSTEM_PROMPT = self.SYSTEM_PROMPT_TEMPLATE.format(
+            current_date=self.current_date,
+            timezone=settings.timezone,
+            categories=self.categories,
+            importances=self.importances,
+            bank_accounts=self.bank_accounts
+        )
@@ -7,28 +7,62 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager
 import os
+import asyncio
 from datetime import datetime
 import logging
 
-from src.routers import expense_router, chatbot_router
+from src.routers import expense_router, chatbot_router, recurring_router, admin_router
 from src.services.nlp_service import ExpenseNLPService
 from src.services.notion_service import NotionService
+from src.services.tenant_service import tenant_registry
+from src.services.recurring_service import run_recurring_scheduler
+from src.services.sync_service import run_notion_sync
+from src.services.profiling_service import profiler, profiling_middleware
 from src.config import settings
+from src.serialization import FastJSONResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Rebuild the default tenant's budgets and indexes from its local store;
+    # other tenants are loaded on their first request
+    tenant_registry.get()
+    recurring_task = asyncio.create_task(
+        run_recurring_scheduler(tenant_registry, settings.recurring_check_interval_seconds)
+    )
+    sync_task = None
+    if settings.offline_first or any(config.get("offline_first") for config in settings.tenants.values()):
+        sync_task = asyncio.create_task(run_notion_sync(
+            tenant_registry,
+            settings.notion_sync_interval_seconds,
+            settings.notion_pull_interval_seconds,
+            settings.notion_sync_batch_size
+        ))
+    yield
+    recurring_task.cancel()
+    if sync_task is not None:
+        sync_task.cancel()
+
 # Create FastAPI app
 app = FastAPI(
     title="Expense Tracker Chatbot API",
     description="A smart chatbot that parses natural language expense inputs and adds them to Notion",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Stage timings and stack profiles for sampled or slow requests
+if profiler.enabled:
+    app.middleware("http")(profiling_middleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -41,6 +75,8 @@ app.add_middleware(
 # Include routers
 app.include_router(expense_router.router, prefix="/api/v1/expenses", tags=["Expenses"])
 app.include_router(chatbot_router.router, prefix="/api/v1/chatbot", tags=["Chatbot"])
+app.include_router(recurring_router.router, prefix="/api/v1/recurring", tags=["Recurring Expenses"])
+app.include_router(admin_router.router, prefix="/api/v1/admin", tags=["Admin"])
 
 @app.get("/")
 async def root():
@@ -6,6 +6,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
+from uuid import uuid4
 
 class ExpenseCategory(str, Enum):
     BILLS_UTILITIES = "bills & utilities"
@@ -44,6 +45,17 @@ class BankAccount(str, Enum):
     INDUSIND_CC_6421 = "INDUSIND CC 6421"
     HDFC_CC_6409 = "HDFC CC 6409"
 
+class RecurrenceFrequency(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+    COLUMNAR = "columnar"
+
 class ExpenseInput(BaseModel):
     text: str = Field(..., description="Natural language expense input", example="snacks food 200 essential yesterday")
 
@@ -56,6 +68,21 @@ class ExpenseData(BaseModel):
     assigned_date: str
     expense_type: ExpenseType = ExpenseType.EXPENSE
 
+class RecurringExpenseRule(BaseModel):
+    id: str = Field(default_factory=lambda: uuid4().hex[:12])
+    expense_name: str
+    category: ExpenseCategory
+    amount: float
+    importance: ExpenseImportance
+    bank_account: BankAccount
+    expense_type: ExpenseType = ExpenseType.EXPENSE
+    frequency: RecurrenceFrequency = RecurrenceFrequency.MONTHLY
+    interval: int = Field(1, ge=1, description="Repeat every N periods")
+    start_date: str = Field(..., description="First occurrence (YYYY-MM-DD)")
+    end_date: Optional[str] = None
+    last_materialized: Optional[str] = None
+    active: bool = True
+
 class ChatbotResponse(BaseModel):
     message: str
     success: bool
@@ -0,0 +1,144 @@
+"""
+Compact in-memory expense records for local stores and indexes.
+
+ExpenseData is the API-facing Pydantic model; ExpenseRecord holds the same
+information in a __slots__ object with small-int enum codes and an epoch-day
+date. Convert between them only at the API boundary.
+"""
+
+from datetime import date
+from typing import Any, Dict, Tuple
+from src.models import ExpenseData, ExpenseCategory, ExpenseImportance, BankAccount, ExpenseType
+
+# Code -> enum member, in declaration order
+CATEGORIES: Tuple[ExpenseCategory, ...] = tuple(ExpenseCategory)
+IMPORTANCES: Tuple[ExpenseImportance, ...] = tuple(ExpenseImportance)
+BANK_ACCOUNTS: Tuple[BankAccount, ...] = tuple(BankAccount)
+EXPENSE_TYPES: Tuple[ExpenseType, ...] = tuple(ExpenseType)
+
+# Value string -> code (str enums hash like their values, so members work as keys too)
+CATEGORY_CODES: Dict[str, int] = {member.value: code for code, member in enumerate(CATEGORIES)}
+IMPORTANCE_CODES: Dict[str, int] = {member.value: code for code, member in enumerate(IMPORTANCES)}
+BANK_ACCOUNT_CODES: Dict[str, int] = {member.value: code for code, member in enumerate(BANK_ACCOUNTS)}
+EXPENSE_TYPE_CODES: Dict[str, int] = {member.value: code for code, member in enumerate(EXPENSE_TYPES)}
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def to_epoch_day(iso_date: str) -> int:
+    return date.fromisoformat(iso_date).toordinal() - EPOCH_ORDINAL
+
+def from_epoch_day(day: int) -> date:
+    return date.fromordinal(day + EPOCH_ORDINAL)
+
+class ExpenseRecord:
+    """A single expense stored as plain slots: name, amount, epoch day and enum codes"""
+
+    __slots__ = ("name", "amount", "day", "category", "importance", "bank_account", "expense_type")
+
+    def __init__(self, name: str, amount: float, day: int, category: int,
+                 importance: int, bank_account: int, expense_type: int):
+        self.name = name
+        self.amount = amount
+        self.day = day
+        self.category = category
+        self.importance = importance
+        self.bank_account = bank_account
+        self.expense_type = expense_type
+
+    @classmethod
+    def from_expense_data(cls, expense: ExpenseData) -> "ExpenseRecord":
+        return cls(
+            expense.expense_name,
+            float(expense.amount),
+            to_epoch_day(expense.assigned_date),
+            CATEGORY_CODES[expense.category],
+            IMPORTANCE_CODES[expense.importance],
+            BANK_ACCOUNT_CODES[expense.bank_account],
+            EXPENSE_TYPE_CODES[expense.expense_type]
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExpenseRecord":
+        """Build from an ExpenseData-shaped dict (e.g. a stored JSON line) without Pydantic"""
+        return cls(
+            data["expense_name"],
+            float(data["amount"]),
+            to_epoch_day(data["assigned_date"]),
+            CATEGORY_CODES[data["category"]],
+            IMPORTANCE_CODES[data["importance"]],
+            BANK_ACCOUNT_CODES[data["bank_account"]],
+            EXPENSE_TYPE_CODES[data.get("expense_type", ExpenseType.EXPENSE.value)]
+        )
+
+    @property
+    def assigned_date(self) -> str:
+        return from_epoch_day(self.day).isoformat()
+
+    @property
+    def month(self) -> str:
+        return self.assigned_date[:7]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as ExpenseData.model_dump(mode="json")"""
+        return {
+            "expense_name": self.name,
+            "category": CATEGORIES[self.category].value,
+            "amount": self.amount,
+            "importance": IMPORTANCES[self.importance].value,
+            "bank_account": BANK_ACCOUNTS[self.bank_account].value,
+            "assigned_date": self.assigned_date,
+            "expense_type": EXPENSE_TYPES[self.expense_type].value
+        }
+
+    def to_expense_data(self) -> ExpenseData:
+        return ExpenseData.model_construct(
+            expense_name=self.name,
+            category=CATEGORIES[self.category],
+            amount=self.amount,
+            importance=IMPORTANCES[self.importance],
+            bank_account=BANK_ACCOUNTS[self.bank_account],
+            assigned_date=self.assigned_date,
+            expense_type=EXPENSE_TYPES[self.expense_type]
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ExpenseRecord):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ExpenseRecord({self.to_dict()!r})"
+
+if __name__ == "__main__":
+    # Memory / throughput comparison against ExpenseData
+    import time
+    import tracemalloc
+
+    N = 100_000
+    rows = [{
+        "expense_name": f"expense {i % 997}",
+        "category": CATEGORIES[i % len(CATEGORIES)].value,
+        "amount": float(i % 5000),
+        "importance": IMPORTANCES[i % len(IMPORTANCES)].value,
+        "bank_account": BANK_ACCOUNTS[i % len(BANK_ACCOUNTS)].value,
+        "assigned_date": from_epoch_day(19000 + i % 1500).isoformat(),
+        "expense_type": "expense"
+    } for i in range(N)]
+
+    def measure(label, build):
+        tracemalloc.start()
+        started = time.perf_counter()
+        items = [build(row) for row in rows]
+        elapsed = time.perf_counter() - started
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<28} {N / elapsed:>12,.0f} rows/s {current / N:>8.0f} bytes/row")
+        return items
+
+    models = measure("ExpenseData(**row)", lambda row: ExpenseData(**row))
+    records = measure("ExpenseRecord.from_dict", ExpenseRecord.from_dict)
+
+    assert all(ExpenseRecord.from_expense_data(m) == r for m, r in zip(models, records))
+    assert all(r.to_expense_data() == m for m, r in zip(models, records))
+    assert all(r.to_dict() == m.model_dump(mode="json") for m, r in zip(models, records))
+    print("round trip ok")
@@ -0,0 +1,56 @@
+"""
+Admin API routes (profiling reports, upstream call coalescing)
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import Optional
+import secrets
+
+from src.config import settings
+from src.services.profiling_service import profiler
+from src.singleflight import coalescing_stats
+
+router = APIRouter()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin API is disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_request_profiles(limit: int = 20):
+    """
+    Recent profiled and slow requests, newest first
+    """
+    return {
+        "success": True,
+        "enabled": profiler.enabled,
+        "slow_request_ms": profiler.slow_request_ms,
+        "sample_rate": profiler.sample_rate,
+        "profiles": profiler.recent(limit)
+    }
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: str):
+    """
+    Full report for one request: stage timings and the sampled stack profile
+    (collapsed stacks, root first, usable with flame graph tools)
+    """
+    report = profiler.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    return report
+
+@router.get("/coalescing", dependencies=[Depends(require_admin)])
+async def get_coalescing_stats():
+    """
+    Per operation: calls, upstream calls made and upstream calls saved by
+    sharing an identical in-flight call
+    """
+    stats = coalescing_stats()
+    return {
+        "success": True,
+        "saved_upstream_calls": sum(item["saved_upstream_calls"] for item in stats),
+        "operations": stats
+    }
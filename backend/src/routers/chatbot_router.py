@@ -5,21 +5,26 @@ Chatbot conversation API routes
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Dict, Any, List
 import logging
+import re
+from starlette.concurrency import run_in_threadpool
 
 from src.models import ExpenseInput, ChatbotResponse
 from src.services.nlp_service import ExpenseNLPService
-from src.services.notion_service import NotionService
 from src.services.llm_service import ExpenseLLMService
+from src.services.tenant_service import TenantContext, get_tenant
+from src.services.profiling_service import stage, profiled
+from src.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_nlp_service():
-    return ExpenseNLPService()
+# Whole words only, checked before questions: "this" is not "hi", but "how does this work?" is help
+GREETING_PATTERN = re.compile(r"\b(hello|hi|hey|start)\b")
+HELP_PATTERN = re.compile(r"\b(help|examples?)\b|\bhow\b(?!\s+(much|many)\b)")
 
-def get_notion_service():
-    return NotionService()
+def get_nlp_service(tenant: TenantContext = Depends(get_tenant)):
+    return ExpenseNLPService(tenant.categorizer)
 
 def get_llm_service():
     return ExpenseLLMService()
@@ -28,8 +33,8 @@ def get_llm_service():
 async def chat_with_bot(
     expense_input: ExpenseInput,
     nlp_service: ExpenseNLPService = Depends(get_nlp_service),
-    notion_service: NotionService = Depends(get_notion_service),
-    llm_service: ExpenseLLMService = Depends(get_llm_service)
+    llm_service: ExpenseLLMService = Depends(get_llm_service),
+    tenant: TenantContext = Depends(get_tenant)
 ):
     """
     Main chatbot endpoint - processes natural language expense input
@@ -38,7 +43,7 @@ async def chat_with_bot(
         user_message = expense_input.text.strip()
 
         # Handle greeting messages
-        if any(greeting in user_message.lower() for greeting in ['hello', 'hi', 'hey', 'start']):
+        if GREETING_PATTERN.search(user_message.lower()):
             return {
                 "response": "Hello! I'm your expense tracker assistant. You can tell me about your expenses in natural language. For example: \"snacks food 200 essential yesterday\" or \"uber ride 150 need today\". I'll parse it and add it to your Notion database!",
                 "success": True,
@@ -46,7 +51,7 @@ async def chat_with_bot(
             }
 
         # Handle help messages
-        if any(help_word in user_message.lower() for help_word in ['help', 'how', 'example']):
+        if HELP_PATTERN.search(user_message.lower()):
             return {
                 "response": """I can help you track expenses! Here are some examples of how to format your expenses:
 
@@ -63,16 +68,36 @@ async def chat_with_bot(
 **Bank Accounts:** hdfc, icici cc, indusind cc, etc.
 **Dates:** today, yesterday, tomorrow, or specific dates like "15 july"
 
+**Questions:** "total food last month", "how much did I spend on uber in march?", "breakdown by category this year"
+
 Just type your expense and I'll add it to your Notion database! 🎯""",
                 "success": True,
                 "type": "help"
             }
 
+        # Answer spending questions locally instead of recording them as expenses
+        if tenant.query_service.is_query(user_message):
+            with stage("query.answer"):
+                answer = tenant.query_service.answer(user_message)
+            return {
+                "response": answer["response"],
+                "success": True,
+                "type": "query_answer",
+                "query": answer["query"],
+                "result": answer["result"]
+            }
+
         # Process expense
         try:
-            # Parse the expense
-            # parsed_expense = nlp_service.parse_expense(user_message)
-            parsed_expense = llm_service.parse_expense(user_message)
+            # Parse the expense locally when that is unambiguous, otherwise ask the LLM
+            parsed_expense = None
+            if settings.local_parse_first:
+                with stage("nlp.resolve_locally"):
+                    parsed_expense = nlp_service.resolve_locally(user_message)
+            parsed_by = "local"
+            if parsed_expense is None:
+                parsed_expense = await run_in_threadpool(profiled("llm.parse_expense", llm_service.parse_expense), user_message)
+                parsed_by = "llm"
 
             # Validate that we have essential information
             if parsed_expense.amount <= 0:
@@ -81,10 +106,19 @@ Just type your expense and I'll add it to your Notion database! 🎯""",
                     detail="Invalid expense amount. Please include a valid expense amount greater than 0."
                 )
 
-            # Add to Notion
-            notion_result = notion_service.create_expense_page(parsed_expense)
+            # Add to Notion (or the local store first for offline-first tenants)
+            notion_result = await tenant.write_expense(parsed_expense)
 
             if notion_result.get("success", False):
+                budget_usage = tenant.budget_service.usage_for(parsed_expense)
+                budget_line = ""
+                if budget_usage:
+                    budget_line = f"\n📊 **Budget:** {tenant.budget_service.format_usage(budget_usage)}"
+                if notion_result.get("sync_state") == "pending":
+                    closing = "Your expense has been saved and will be synced to Notion shortly! 🎉"
+                else:
+                    closing = "Your expense has been added to Notion! 🎉"
+
                 response_message = f"""✅ **Expense added successfully!**
 
 💰 **Amount:** ₹{parsed_expense.amount}
@@ -92,9 +126,9 @@ Just type your expense and I'll add it to your Notion database! 🎯""",
 📂 **Category:** {parsed_expense.category.value}
 ⭐ **Importance:** {parsed_expense.importance.value}
 🏦 **Account:** {parsed_expense.bank_account.value}
-📅 **Date:** {parsed_expense.assigned_date}
+📅 **Date:** {parsed_expense.assigned_date}{budget_line}
 
-Your expense has been added to Notion! 🎉"""
+{closing}"""
 
                 return {
                     "response": response_message,
@@ -108,7 +142,10 @@ Your expense has been added to Notion! 🎉"""
                         "bank_account": parsed_expense.bank_account.value,
                         "assigned_date": parsed_expense.assigned_date
                     },
-                    "notion_page_url": notion_result.get("url", "")
+                    "parsed_by": parsed_by,
+                    "notion_page_url": notion_result.get("url", ""),
+                    "sync_state": notion_result.get("sync_state", "synced"),
+                    "budget_usage": budget_usage
                 }
             else:
                 raise HTTPException(
@@ -159,6 +196,10 @@ async def get_example_messages():
             {
                 "input": "electricity bill 2500 essential indusind cc",
                 "description": "Utility bill payment"
+            },
+            {
+                "input": "total food last month",
+                "description": "Spending question answered from your history"
             }
         ]
     }
@@ -3,23 +3,35 @@ Expense-related API routes
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+from datetime import datetime
 import logging
+import time
 
-from src.models import ExpenseInput, ExpenseData, ChatbotResponse, NotionPageResponse
+from src.models import ExpenseInput, ExpenseData, ChatbotResponse, NotionPageResponse, ExpenseCategory, BankAccount, ExportFormat
 from src.services.nlp_service import ExpenseNLPService
-from src.services.notion_service import NotionService
+from src.services.tenant_service import TenantContext, get_tenant
+from src.services.export_service import export_expenses, MEDIA_TYPES, FILE_EXTENSIONS
+from src.services.profiling_service import stage
+from src.services.extraction_service import local_today
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Dependency injection
-def get_nlp_service():
-    return ExpenseNLPService()
+def get_nlp_service(tenant: TenantContext = Depends(get_tenant)):
+    return ExpenseNLPService(tenant.categorizer)
 
-def get_notion_service():
-    return NotionService()
+def validate_date_range(start_date: Optional[str], end_date: Optional[str]) -> None:
+    # Zero-padded only: search compares the month prefix and parses with fromisoformat
+    try:
+        for value in (start_date, end_date):
+            if value and datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d') != value:
+                raise ValueError(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
 
 @router.post("/parse", response_model=ChatbotResponse)
 async def parse_expense_text(
@@ -30,7 +42,8 @@ async def parse_expense_text(
     Parse natural language expense text into structured data
     """
     try:
-        parsed_expense = nlp_service.parse_expense(expense_input.text)
+        with stage("nlp.parse_expense"):
+            parsed_expense = nlp_service.parse_expense(expense_input.text)
 
         return ChatbotResponse(
             message="Successfully parsed expense text",
@@ -56,13 +69,13 @@ async def parse_expense_text(
 @router.post("/add-to-notion", response_model=NotionPageResponse)
 async def add_expense_to_notion(
     expense_data: ExpenseData,
-    notion_service: NotionService = Depends(get_notion_service)
+    tenant: TenantContext = Depends(get_tenant)
 ):
     """
     Add parsed expense data to Notion database
     """
     try:
-        result = notion_service.create_expense_page(expense_data)
+        result = await tenant.write_expense(expense_data)
 
         return NotionPageResponse(
             page_id=result.get("page_id", ""),
@@ -78,18 +91,19 @@ async def add_expense_to_notion(
 async def process_complete_expense(
     expense_input: ExpenseInput,
     nlp_service: ExpenseNLPService = Depends(get_nlp_service),
-    notion_service: NotionService = Depends(get_notion_service)
+    tenant: TenantContext = Depends(get_tenant)
 ):
     """
     Complete workflow: Parse expense text and add to Notion in one step
     """
     try:
         # Parse the expense
-        parsed_expense = nlp_service.parse_expense(expense_input.text)
+        with stage("nlp.parse_expense"):
+            parsed_expense = nlp_service.parse_expense(expense_input.text)
         logger.info(f"Parsed expense: {parsed_expense}")
 
         # Add to Notion
-        notion_result = notion_service.create_expense_page(parsed_expense)
+        notion_result = await tenant.write_expense(parsed_expense)
         logger.info(f"Notion result: {notion_result}")
 
         return {
@@ -108,21 +122,101 @@ async def process_complete_expense(
             "notion_page": {
                 "page_id": notion_result.get("page_id", ""),
                 "url": notion_result.get("url", "")
-            }
+            },
+            "sync_state": notion_result.get("sync_state", "synced")
         }
     except Exception as e:
         logger.error(f"Error processing expense: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process expense: {str(e)}")
 
+@router.get("/budgets")
+async def get_budget_status(
+    month: Optional[str] = None,
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Get spend against every configured monthly budget (month as YYYY-MM, defaults to current)
+    """
+    month = month or local_today().strftime('%Y-%m')
+    return {
+        "success": True,
+        "month": month,
+        "budgets": tenant.budget_service.month_status(month)
+    }
+
+@router.get("/search")
+async def search_expenses(
+    q: str = "",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[ExpenseCategory] = None,
+    bank_account: Optional[BankAccount] = None,
+    limit: int = 50,
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Search past expenses by name (typo tolerant), optionally filtered by
+    date range (YYYY-MM-DD, inclusive), category and bank account
+    """
+    validate_date_range(start_date, end_date)
+    started = time.perf_counter()
+    result = tenant.search_index.search(q, start_date, end_date, category, bank_account, limit)
+    return {
+        "success": True,
+        "query": q,
+        "total_matches": result["total_matches"],
+        "total_amount": result["total_amount"],
+        "expanded_tokens": result["expanded_tokens"],
+        "results": [record.to_dict() for record in result["results"]],
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+@router.get("/export")
+async def export_expense_history(
+    format: ExportFormat = ExportFormat.CSV,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Stream expense history from the local store as CSV, NDJSON or a compact
+    columnar binary format, optionally limited to a date range (YYYY-MM-DD, inclusive)
+    """
+    validate_date_range(start_date, end_date)
+    filename = f"expenses_{start_date or 'start'}_{end_date or 'end'}.{FILE_EXTENSIONS[format]}"
+    return StreamingResponse(
+        export_expenses(tenant.expense_store, format, start_date, end_date),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/sync")
+async def get_sync_status(
+    conflicts: int = 20,
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Replication state of an offline-first store: pending / synced counts, the last
+    push error and recent Notion edits that overwrote local versions
+    """
+    if not tenant.offline_first:
+        return {"success": True, "offline_first": False}
+    return {
+        "success": True,
+        "offline_first": True,
+        "status": tenant.expense_store.sync_status(),
+        "recent_conflicts": tenant.expense_store.conflicts(conflicts)
+    }
+
 @router.get("/test-notion")
 async def test_notion_connection(
-    notion_service: NotionService = Depends(get_notion_service)
+    tenant: TenantContext = Depends(get_tenant)
 ):
     """
     Test connection to Notion database
     """
     try:
-        result = notion_service.test_connection()
+        result = await tenant.call_notion(tenant.notion_service.test_connection)
         return result
     except Exception as e:
         logger.error(f"Error testing Notion connection: {str(e)}")
@@ -130,13 +224,13 @@ async def test_notion_connection(
 
 @router.get("/list-databases")
 async def list_notion_databases(
-    notion_service: NotionService = Depends(get_notion_service)
+    tenant: TenantContext = Depends(get_tenant)
 ):
     """
     List all databases accessible by the Notion integration
     """
     try:
-        result = notion_service.list_databases()
+        result = await tenant.call_notion(tenant.notion_service.list_databases)
         return result
     except Exception as e:
         logger.error(f"Error listing Notion databases: {str(e)}")
@@ -144,13 +238,13 @@ async def list_notion_databases(
 
 @router.get("/database-schema")
 async def get_database_schema(
-    notion_service: NotionService = Depends(get_notion_service)
+    tenant: TenantContext = Depends(get_tenant)
 ):
     """
     Get the schema of the current Notion database
     """
     try:
-        result = notion_service.get_database_schema()
+        result = await tenant.call_notion(tenant.notion_service.get_database_schema)
         return result
     except Exception as e:
         logger.error(f"Error getting database schema: {str(e)}")
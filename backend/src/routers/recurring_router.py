@@ -0,0 +1,87 @@
+"""
+Recurring expense rule API routes
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List
+from datetime import datetime
+import logging
+
+from src.models import RecurringExpenseRule
+from src.services.tenant_service import TenantContext, get_tenant
+from src.services.extraction_service import local_today
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/", response_model=List[RecurringExpenseRule])
+async def list_recurring_rules(
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    List all recurring expense rules
+    """
+    return tenant.recurring_service.list_rules()
+
+@router.post("/", response_model=RecurringExpenseRule)
+async def create_recurring_rule(
+    rule: RecurringExpenseRule,
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Create a recurring expense rule (e.g. monthly rent or a SIP).
+    Past occurrences since start_date are written on the next scheduler run.
+    """
+    try:
+        datetime.strptime(rule.start_date, '%Y-%m-%d')
+        if rule.end_date:
+            datetime.strptime(rule.end_date, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if rule.last_materialized is not None:
+        raise HTTPException(status_code=400, detail="last_materialized is maintained by the scheduler")
+    try:
+        return tenant.recurring_service.add_rule(rule)
+    except KeyError:
+        raise HTTPException(status_code=409, detail=f"Recurring rule already exists: {rule.id}")
+
+@router.delete("/{rule_id}")
+async def delete_recurring_rule(
+    rule_id: str,
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Delete a recurring expense rule (already written expenses are kept)
+    """
+    if not tenant.recurring_service.delete_rule(rule_id):
+        raise HTTPException(status_code=404, detail=f"Recurring rule not found: {rule_id}")
+    return {"success": True, "message": f"Deleted recurring rule {rule_id}"}
+
+@router.get("/due")
+async def list_due_occurrences(
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Occurrences that are due but not yet written to Notion
+    """
+    due = tenant.recurring_service.due(local_today())
+    return {
+        "success": True,
+        "count": len(due),
+        "expenses": [expense.model_dump(mode="json") for expense in due]
+    }
+
+@router.post("/run")
+async def run_recurring_rules(
+    tenant: TenantContext = Depends(get_tenant)
+):
+    """
+    Write the next batch of due occurrences now instead of waiting for the scheduler
+    """
+    try:
+        result = await tenant.recurring_service.materialize(tenant.write_expense)
+        return {"success": result["failed"] == 0, **result}
+    except Exception as e:
+        logger.error(f"Error materializing recurring expenses: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to materialize recurring expenses: {str(e)}")
@@ -0,0 +1,328 @@
+"""
+Local analytics: answers natural language spending questions from
+precomputed daily aggregates, without the LLM or Notion
+"""
+
+import re
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from src.models import ExpenseCategory, ExpenseImportance, BankAccount, ExpenseType
+from src.records import (
+    ExpenseRecord, CATEGORIES, IMPORTANCES, BANK_ACCOUNTS,
+    CATEGORY_CODES, IMPORTANCE_CODES, BANK_ACCOUNT_CODES, EXPENSE_TYPE_CODES, to_epoch_day
+)
+from src.services.nlp_service import ExpenseNLPService
+from src.services.extraction_service import extract, local_today
+from src.services.search_service import ExpenseSearchIndex, tokenize
+
+# (category, importance, bank_account, expense_type) codes
+CubeKey = Tuple[int, int, int, int]
+
+DIMENSIONS = {
+    "category": (0, CATEGORY_CODES, CATEGORIES),
+    "importance": (1, IMPORTANCE_CODES, IMPORTANCES),
+    "bank_account": (2, BANK_ACCOUNT_CODES, BANK_ACCOUNTS),
+}
+
+class ExpenseAnalytics:
+    """
+    Keeps a per-day cube of [amount, count] keyed by category, importance,
+    bank account and expense type codes. Any combination of filters over a
+    date range is answered by walking the days in range, never the raw expenses.
+    """
+
+    def __init__(self):
+        self.daily: Dict[int, Dict[CubeKey, List[float]]] = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+
+    def record(self, record: ExpenseRecord) -> None:
+        cell = self.daily[record.day][(record.category, record.importance, record.bank_account, record.expense_type)]
+        cell[0] += record.amount
+        cell[1] += 1
+
+    def aggregate(
+        self,
+        start: date,
+        end: date,
+        category: Optional[str] = None,
+        importance: Optional[str] = None,
+        bank_account: Optional[str] = None,
+        expense_type: str = ExpenseType.EXPENSE.value,
+        group_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Sum amounts and counts over an inclusive date range"""
+        wanted = (
+            CATEGORY_CODES[category] if category is not None else None,
+            IMPORTANCE_CODES[importance] if importance is not None else None,
+            BANK_ACCOUNT_CODES[bank_account] if bank_account is not None else None,
+            EXPENSE_TYPE_CODES[expense_type]
+        )
+        group_position = DIMENSIONS[group_by][0] if group_by else None
+        total, count = 0.0, 0
+        groups: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0])
+        for day in range(to_epoch_day(start.isoformat()), to_epoch_day(end.isoformat()) + 1):
+            cube = self.daily.get(day)
+            if not cube:
+                continue
+            for key, (amount, n) in cube.items():
+                if any(w is not None and w != k for w, k in zip(wanted, key)):
+                    continue
+                total += amount
+                count += n
+                if group_position is not None:
+                    group = groups[key[group_position]]
+                    group[0] += amount
+                    group[1] += n
+        members = DIMENSIONS[group_by][2] if group_by else ()
+        return {
+            "total": round(total, 2),
+            "count": count,
+            "groups": {members[code].value: {"total": round(a, 2), "count": n} for code, (a, n) in
+                       sorted(groups.items(), key=lambda item: -item[1][0])}
+        }
+
+class ExpenseQueryParser:
+    """Detects spending questions and turns them into structured queries"""
+
+    QUESTION_PATTERN = re.compile(r"^(what|which|total|sum|show|list|breakdown|average|avg)\b|\?\s*$")
+    EXPLICIT_QUESTION_PATTERN = re.compile(r"\b(how much|how many)\b")
+    # Numbers that belong to a period, not an amount ("last 30 days", "in 2024")
+    PERIOD_NUMBER_PATTERN = re.compile(r"\b(?:(?:last|past)\s+\d+\s+days|(?:in|for|during)\s+(?:19|20)\d{2})\b")
+    YEAR_PATTERN = re.compile(r"\b(?:in|for|during)\s+((?:19|20)\d{2})\b")
+    STOP_WORDS = {
+        'how', 'much', 'many', 'what', 'which', 'total', 'sum', 'show', 'list', 'breakdown',
+        'average', 'avg', 'did', 'do', 'i', 'we', 'my', 'me', 'spend', 'spent', 'spending',
+        'on', 'in', 'for', 'of', 'the', 'a', 'an', 'is', 'was', 'were', 'are', 'have', 'has',
+        'by', 'per', 'from', 'at', 'expenses', 'expense', 'all', 'so', 'far', 'and', 'with',
+        'category', 'categories', 'importance', 'account', 'accounts', 'bank', 'times', 'transactions',
+        'today', 'yesterday', 'this', 'last', 'week', 'month', 'year', 'days', 'day', 'past',
+        'income', 'earn', 'earned', 'cc', 'may'
+    }
+
+    def __init__(self):
+        nlp = ExpenseNLPService()
+        self.bank_accounts = nlp.bank_accounts
+        self.months = nlp.months
+        month_names = "|".join(sorted(self.months, key=len, reverse=True))
+        self.month_pattern = re.compile(rf"\b({month_names})\b(?:,?\s+((?:19|20)\d{{2}})\b)?")
+        # Expense keywords ("bills", "groceries", "uber") as category synonyms
+        self.category_words: Dict[str, str] = {}
+        for category, keywords in nlp.categories.items():
+            for keyword in keywords:
+                self.category_words.setdefault(keyword, category.value)
+                self.category_words.setdefault(f"{keyword}s", category.value)
+
+    def is_query(self, text: str) -> bool:
+        """
+        "how much/how many" always asks; otherwise a question word or a
+        trailing "?" only counts when no amount is left ("coffee 50?" and
+        "show tickets 400" are expenses)
+        """
+        text_lower = text.lower().strip()
+        if self.EXPLICIT_QUESTION_PATTERN.search(text_lower):
+            return True
+        if not self.QUESTION_PATTERN.search(text_lower):
+            return False
+        return extract(self.PERIOD_NUMBER_PATTERN.sub(" ", text_lower))["amount"] is None
+
+    def parse(self, text: str, today: Optional[date] = None,
+              is_name: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+        """
+        Structured query for a question. Category synonyms that `is_name`
+        reports as words of past expense names ("uber") stay name searches.
+        """
+        text_lower = text.lower().strip()
+        today = today or local_today()
+        start, end, period, date_words = self._extract_period(text_lower, today)
+
+        query = {
+            "aggregation": "sum",
+            "group_by": None,
+            "start_date": start,
+            "end_date": end,
+            "period": period,
+            "category": None,
+            "importance": None,
+            "bank_account": None,
+            "expense_type": ExpenseType.EXPENSE.value,
+            "name_query": ""
+        }
+        if text_lower.startswith("how many"):
+            query["aggregation"] = "count"
+        elif re.search(r"\b(average|avg)\b", text_lower):
+            query["aggregation"] = "average"
+        if re.search(r"\b(income|earn|earned)\b", text_lower):
+            query["expense_type"] = ExpenseType.INCOME.value
+
+        group_match = re.search(r"\b(?:by|per|each)\s+(category|importance|account|bank)", text_lower)
+        if group_match or "breakdown" in text_lower:
+            dimension = group_match.group(1) if group_match else "category"
+            query["group_by"] = "bank_account" if dimension in ("account", "bank") else dimension
+
+        used = set(date_words)
+        tokens = tokenize(text_lower)
+        for category in ExpenseCategory:
+            if re.search(rf"\b{re.escape(category.value)}\b", text_lower):
+                query["category"] = category.value
+                used.update(tokenize(category.value))
+                break
+        if query["category"] is None:
+            for token in tokens:
+                category = self.category_words.get(token)
+                if category is not None and token not in used and not (is_name and is_name(token)):
+                    query["category"] = category
+                    used.add(token)
+                    break
+        for importance in ExpenseImportance:
+            if importance.value in tokens:
+                query["importance"] = importance.value
+                used.add(importance.value)
+                break
+        for bank_key, bank_value in self.bank_accounts.items():
+            if re.search(rf"\b{re.escape(bank_key)}\b", text_lower):
+                query["bank_account"] = bank_value.value
+                used.update(tokenize(bank_key))
+                break
+
+        name_tokens = [t for t in tokens if t not in used and t not in self.STOP_WORDS and not t.isdigit()]
+        query["name_query"] = " ".join(name_tokens)
+        return query
+
+    def _extract_period(self, text: str, today: date) -> Tuple[date, date, str, List[str]]:
+        """Resolve the date range a question refers to, defaulting to this month"""
+        days_match = re.search(r"\b(?:last|past)\s+(\d+)\s+days\b", text)
+        if days_match:
+            n = int(days_match.group(1))
+            return today - timedelta(days=n - 1), today, f"last {n} days", []
+        if "today" in text:
+            return today, today, "today", []
+        if "yesterday" in text:
+            day = today - timedelta(days=1)
+            return day, day, "yesterday", []
+        if "this week" in text:
+            return today - timedelta(days=today.weekday()), today, "this week", []
+        if "last week" in text:
+            start = today - timedelta(days=today.weekday() + 7)
+            return start, start + timedelta(days=6), "last week", []
+        if "last month" in text:
+            end = today.replace(day=1) - timedelta(days=1)
+            return end.replace(day=1), end, "last month", []
+        if "this year" in text:
+            return today.replace(month=1, day=1), today, "this year", []
+        if "last year" in text:
+            year = today.year - 1
+            return date(year, 1, 1), date(year, 12, 31), "last year", []
+        for match in self.month_pattern.finditer(text):
+            word, year_word = match.group(1), match.group(2)
+            if word == "may" and not year_word and not re.search(r"\b(?:in|for|during)\s+may\b", text):
+                continue
+            month = self.months[word]
+            if year_word:
+                year = int(year_word)
+            else:
+                year = today.year if month <= today.month else today.year - 1
+            last_day = calendar.monthrange(year, month)[1]
+            return date(year, month, 1), date(year, month, last_day), f"in {calendar.month_name[month]} {year}", [word]
+        year_match = self.YEAR_PATTERN.search(text)
+        if year_match:
+            year = int(year_match.group(1))
+            return date(year, 1, 1), min(date(year, 12, 31), today), f"in {year}", []
+        return today.replace(day=1), today, "this month", []
+
+class QueryAnsweringService:
+    """Answers parsed questions from the analytics cube or the search index"""
+
+    def __init__(self, analytics: ExpenseAnalytics, search_index: ExpenseSearchIndex, parser: ExpenseQueryParser):
+        self.analytics = analytics
+        self.search_index = search_index
+        self.parser = parser
+
+    def is_query(self, text: str) -> bool:
+        return self.parser.is_query(text)
+
+    def answer(self, text: str) -> Dict[str, Any]:
+        query = self.parser.parse(text, is_name=lambda token: token in self.search_index.postings)
+        start, end = query["start_date"], query["end_date"]
+
+        if query["name_query"]:
+            # Free text such as "uber" can't come from the cube, use the name index
+            found = self.search_index.search(
+                query["name_query"],
+                start.isoformat(),
+                end.isoformat(),
+                ExpenseCategory(query["category"]) if query["category"] else None,
+                BankAccount(query["bank_account"]) if query["bank_account"] else None,
+                limit=len(self.search_index.documents)
+            )
+            result = self._summarize(found["results"], query["importance"], query["expense_type"], query["group_by"])
+        else:
+            result = self.analytics.aggregate(
+                start, end,
+                category=query["category"],
+                importance=query["importance"],
+                bank_account=query["bank_account"],
+                expense_type=query["expense_type"],
+                group_by=query["group_by"]
+            )
+
+        query["start_date"] = start.isoformat()
+        query["end_date"] = end.isoformat()
+        return {
+            "response": self._format(query, result),
+            "query": query,
+            "result": result
+        }
+
+    @staticmethod
+    def _summarize(
+        records: List[ExpenseRecord],
+        importance: Optional[str],
+        expense_type: str,
+        group_by: Optional[str]
+    ) -> Dict[str, Any]:
+        """Apply the filters the name index doesn't know about and total like `aggregate`"""
+        importance_code = IMPORTANCE_CODES[importance] if importance is not None else None
+        expense_type_code = EXPENSE_TYPE_CODES[expense_type]
+        total, count = 0.0, 0
+        groups: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0])
+        for record in records:
+            if record.expense_type != expense_type_code:
+                continue
+            if importance_code is not None and record.importance != importance_code:
+                continue
+            total += record.amount
+            count += 1
+            if group_by:
+                group = groups[getattr(record, group_by)]
+                group[0] += record.amount
+                group[1] += 1
+        members = DIMENSIONS[group_by][2] if group_by else ()
+        return {
+            "total": round(total, 2),
+            "count": count,
+            "groups": {members[code].value: {"total": round(a, 2), "count": n} for code, (a, n) in
+                       sorted(groups.items(), key=lambda item: -item[1][0])}
+        }
+
+    @staticmethod
+    def _format(query: Dict[str, Any], result: Dict[str, Any]) -> str:
+        subject = " ".join(filter(None, [query["name_query"], query["category"], query["importance"]]))
+        verb = "earned" if query["expense_type"] == ExpenseType.INCOME.value else "spent"
+        scope = f" on {subject}" if subject else ""
+        if query["bank_account"]:
+            scope += f" with {query['bank_account']}"
+        period = query["period"]
+
+        if query["aggregation"] == "count":
+            message = f"🧾 You had **{result['count']}** expenses{scope} {period}."
+        elif query["aggregation"] == "average":
+            average = result["total"] / result["count"] if result["count"] else 0.0
+            message = f"📊 On average you {verb} **₹{average:,.2f}** per expense{scope} {period} ({result['count']} expenses)."
+        else:
+            message = f"💰 You {verb} **₹{result['total']:,.2f}**{scope} {period} ({result['count']} expenses)."
+
+        if result["groups"]:
+            lines = [f"• {name}: ₹{group['total']:,.2f} ({group['count']})" for name, group in result["groups"].items()]
+            message += "\n\n" + "\n".join(lines)
+        return message
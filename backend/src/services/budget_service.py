@@ -0,0 +1,80 @@
+"""
+Monthly budget tracking backed by running per-month totals
+"""
+
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+from src.models import ExpenseData, ExpenseType
+from src.records import ExpenseRecord, CATEGORIES, IMPORTANCES, EXPENSE_TYPE_CODES
+
+class BudgetService:
+    """
+    Tracks spend against monthly budgets per category and per importance.
+
+    Totals are kept in a dict keyed by (month, dimension, value) and updated
+    once per written expense, so checking a budget never scans history.
+    """
+
+    DIMENSIONS = ("category", "importance")
+
+    def __init__(self, category_budgets: Dict[str, float], importance_budgets: Dict[str, float]):
+        self.budgets = {
+            "category": {k.lower(): float(v) for k, v in category_budgets.items()},
+            "importance": {k.lower(): float(v) for k, v in importance_budgets.items()},
+        }
+        self.totals: Dict[Tuple[str, str, str], float] = defaultdict(float)
+
+    @staticmethod
+    def _month(assigned_date: str) -> str:
+        return assigned_date[:7]
+
+    def record(self, record: ExpenseRecord) -> None:
+        """Add an expense to the running monthly totals"""
+        if record.expense_type != EXPENSE_TYPE_CODES[ExpenseType.EXPENSE]:
+            return
+        month = record.month
+        self.totals[(month, "category", CATEGORIES[record.category].value)] += record.amount
+        self.totals[(month, "importance", IMPORTANCES[record.importance].value)] += record.amount
+
+    def spent(self, month: str, dimension: str, value: str) -> float:
+        return self.totals.get((month, dimension, value), 0.0)
+
+    def usage_for(self, expense: ExpenseData) -> List[Dict[str, Any]]:
+        """Budget usage for the category and importance of a single expense"""
+        month = self._month(expense.assigned_date)
+        usage = []
+        for dimension, value in (("category", expense.category.value), ("importance", expense.importance.value)):
+            entry = self._usage(month, dimension, value)
+            if entry is not None:
+                usage.append(entry)
+        return usage
+
+    def month_status(self, month: str) -> List[Dict[str, Any]]:
+        """Budget usage for every configured budget in a month"""
+        status = []
+        for dimension in self.DIMENSIONS:
+            for value in self.budgets[dimension]:
+                entry = self._usage(month, dimension, value)
+                if entry is not None:
+                    status.append(entry)
+        return status
+
+    def _usage(self, month: str, dimension: str, value: str) -> Optional[Dict[str, Any]]:
+        budget = self.budgets[dimension].get(value)
+        if not budget:
+            return None
+        spent = self.spent(month, dimension, value)
+        return {
+            "month": month,
+            "dimension": dimension,
+            "name": value,
+            "spent": round(spent, 2),
+            "budget": budget,
+            "remaining": round(budget - spent, 2),
+            "percent_used": round(spent / budget * 100),
+        }
+
+    @staticmethod
+    def format_usage(usage: List[Dict[str, Any]]) -> str:
+        """Render usage entries like 'food: 82% of monthly budget'"""
+        return ", ".join(f"{u['name']}: {u['percent_used']}% of monthly budget" for u in usage)
@@ -0,0 +1,138 @@
+"""
+Local expense categorizer learned from the user's own past expenses
+"""
+
+import threading
+import zlib
+from typing import Dict, Any, Optional
+import numpy as np
+from src.records import ExpenseRecord, CATEGORIES, IMPORTANCES, BANK_ACCOUNTS
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+class ExpenseCategorizer:
+    """
+    Nearest-neighbour categorizer over hashed character n-gram vectors.
+
+    Every distinct expense name is one L2-normalized column of a NumPy
+    feature x name matrix, with per-name counts of the category, importance
+    and bank account it was recorded with. A query vector has only a few dozen
+    non-zero features, so similarities are computed from just those matrix
+    rows. The top-k names by cosine similarity vote with similarity-weighted
+    label distributions. Repeated names only bump their counts, so the matrix
+    grows with the vocabulary, not with history.
+    """
+
+    def __init__(self, dim: int = 512, k: int = 5, min_similarity: float = 0.35, min_confidence: float = 0.5):
+        self.dim = dim
+        self.k = k
+        self.min_similarity = min_similarity
+        self.min_confidence = min_confidence
+        self.rows: Dict[str, int] = {}
+        self.size = 0
+        self._lock = threading.Lock()
+        self._allocate(256)
+
+    def _allocate(self, capacity: int) -> None:
+        def grow(old: Optional[np.ndarray], width: int) -> np.ndarray:
+            new = np.zeros((capacity, width), dtype=np.float32)
+            if old is not None:
+                new[:self.size] = old[:self.size]
+            return new
+
+        features = np.zeros((self.dim, capacity), dtype=np.float32)
+        if getattr(self, "features", None) is not None:
+            features[:, :self.size] = self.features[:, :self.size]
+        self.features = features
+        self.capacity = capacity
+        self.category_counts = grow(getattr(self, "category_counts", None), len(CATEGORIES))
+        self.importance_counts = grow(getattr(self, "importance_counts", None), len(IMPORTANCES))
+        self.account_counts = grow(getattr(self, "account_counts", None), len(BANK_ACCOUNTS))
+
+    def vectorize(self, name: str) -> np.ndarray:
+        """Signed feature hashing of padded character 2-4 grams plus whole words"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = normalize_name(name)
+        padded = f" {text} "
+        features = [padded[i:i + n] for n in (2, 3, 4) for i in range(len(padded) - n + 1)]
+        features.extend(f"w:{word}" for word in text.split())
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, record: ExpenseRecord) -> None:
+        """Learn from a confirmed expense"""
+        key = normalize_name(record.name)
+        if not key:
+            return
+        with self._lock:
+            row = self.rows.get(key)
+            if row is None:
+                if self.size == self.capacity:
+                    self._allocate(self.size * 2)
+                row = self.size
+                self.features[:, row] = self.vectorize(key)
+                self.rows[key] = row
+                self.size += 1
+            self.category_counts[row, record.category] += 1
+            self.importance_counts[row, record.importance] += 1
+            self.account_counts[row, record.bank_account] += 1
+
+    def predict(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Predicted category, importance and bank account with confidences,
+        or None if nothing similar enough has been seen yet
+        """
+        if self.size == 0 or not normalize_name(name):
+            return None
+        size = self.size
+        query = self.vectorize(name)
+        nonzero = np.flatnonzero(query)
+        similarities = query[nonzero] @ self.features[nonzero, :size]
+        k = min(self.k, size)
+        top = np.argpartition(similarities, -k)[-k:]
+        top = top[similarities[top] >= self.min_similarity]
+        if len(top) == 0:
+            return None
+        weights = similarities[top]
+
+        def vote(counts: np.ndarray, members: tuple) -> Dict[str, Any]:
+            rows = counts[top]
+            distribution = rows / rows.sum(axis=1, keepdims=True)
+            scores = weights @ distribution
+            best = int(np.argmax(scores))
+            confidence = float(scores[best] / scores.sum())
+            return {"value": members[best] if confidence >= self.min_confidence else None,
+                    "confidence": round(confidence, 3)}
+
+        return {
+            "category": vote(self.category_counts, CATEGORIES),
+            "importance": vote(self.importance_counts, IMPORTANCES),
+            "bank_account": vote(self.account_counts, BANK_ACCOUNTS),
+            "similarity": round(float(weights.max()), 3)
+        }
+
+if __name__ == "__main__":
+    # Prediction latency over a few thousand learned names
+    import random
+    import time
+    from src.records import to_epoch_day
+
+    random.seed(7)
+    categorizer = ExpenseCategorizer()
+    merchants = [f"{word} {i}" for i in range(1000) for word in ("swiggy", "uber", "amazon", "netflix", "apollo")]
+    for i, merchant in enumerate(merchants):
+        category = {"swiggy": 4, "uber": 6, "amazon": 1, "netflix": 5, "apollo": 14}[merchant.split()[0]]
+        categorizer.add(ExpenseRecord(merchant, 100.0, to_epoch_day("2024-07-15"), category, i % 5, i % 5, 1))
+
+    queries = [f"{random.choice(['swigy', 'uber ride', 'amazon order', 'netflix plan', 'apollo pharmacy'])} {random.randint(0, 999)}"
+               for _ in range(2000)]
+    started = time.perf_counter()
+    for query in queries:
+        categorizer.predict(query)
+    elapsed = time.perf_counter() - started
+    print(f"{categorizer.size} names, {elapsed / len(queries) * 1e6:.0f} us per prediction")
+    print(queries[0], "->", categorizer.predict(queries[0]))
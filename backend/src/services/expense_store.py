@@ -0,0 +1,151 @@
+"""
+Local expense store: an append-only log of every expense written through the API
+"""
+
+import itertools
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from src.models import ExpenseData
+from src.records import ExpenseRecord
+from src.serialization import loads
+import logging
+
+logger = logging.getLogger(__name__)
+
+ExpenseListener = Callable[[ExpenseRecord], None]
+
+class ExpenseStore:
+    """
+    Keeps a local JSON-lines copy of written expenses so that derived
+    structures (budgets, indexes, ...) can be rebuilt without calling Notion.
+    Listeners are notified once per expense, both on replay and on new writes,
+    with compact ExpenseRecord objects rather than ExpenseData.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._listeners: List[ExpenseListener] = []
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Bumped whenever a stored expense changes in place (appends don't count)
+        self._edits = 0
+
+    def subscribe(self, listener: ExpenseListener) -> None:
+        """Register a callback invoked for every stored expense"""
+        self._listeners.append(listener)
+
+    def replace_listeners(self, listeners: List[ExpenseListener], replay: bool = False) -> bool:
+        """
+        Swap every listener at once, e.g. for freshly built derived structures.
+        With replay, the new listeners first receive the whole history, read
+        without holding the lock so writes carry on. Rows appended meanwhile
+        are handed over under the lock right before the swap, so none are
+        missed or seen twice. If a stored expense was edited meanwhile the new
+        listeners hold a stale copy of it: nothing is swapped and False is
+        returned, so the caller can build fresh ones and try again.
+        """
+        if not replay:
+            with self._lock:
+                self._listeners = list(listeners)
+            return True
+        with self._lock:
+            edits = self._edits
+        replayed = self._feed(listeners, self.iter_rows())
+        for _ in range(3):
+            # Catch up on rows appended meanwhile, leaving little for the locked pass
+            caught_up = self._feed(listeners, self._rows_after(replayed))
+            replayed += caught_up
+            if not caught_up:
+                break
+        with self._lock:
+            if self._edits != edits:
+                return False
+            self._feed(listeners, self._rows_after(replayed))
+            self._listeners = list(listeners)
+            return True
+
+    @staticmethod
+    def _feed(listeners: List[ExpenseListener], rows: Iterable[Dict[str, Any]]) -> int:
+        """Hand rows to listeners as records; returns the number of rows read"""
+        count = 0
+        for row in rows:
+            count += 1
+            try:
+                record = ExpenseRecord.from_dict(row)
+            except Exception as e:
+                logger.warning(f"Skipping invalid expense record: {str(e)}")
+                continue
+            for listener in listeners:
+                try:
+                    listener(record)
+                except Exception as e:
+                    logger.error(f"Expense listener failed: {str(e)}")
+        return count
+
+    def _rows_after(self, count: int) -> Iterator[Dict[str, Any]]:
+        """Rows stored after the first `count`, oldest first"""
+        return itertools.islice(self.iter_rows(), count, None)
+
+    def load(self) -> int:
+        """Replay the log to all listeners; safe to call more than once"""
+        with self._lock:
+            if self._loaded:
+                return 0
+            count = 0
+            for record in self.iter_records():
+                self._notify(record)
+                count += 1
+            self._loaded = True
+        logger.info(f"Loaded {count} expenses from local store")
+        return count
+
+    def add(self, expense: ExpenseData) -> None:
+        """Append an expense to the log and update all listeners"""
+        line = expense.model_dump_json() + "\n"
+        with self._lock:
+            # Replay history first so listeners never see a write twice
+            self.load()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._notify(ExpenseRecord.from_expense_data(expense))
+
+    def iter_rows(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily read stored expenses as ExpenseData-shaped dicts, oldest first,
+        optionally limited to an inclusive YYYY-MM-DD date range
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = loads(line)
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable expense record: {str(e)}")
+                    continue
+                if start_date and row["assigned_date"] < start_date:
+                    continue
+                if end_date and row["assigned_date"] > end_date:
+                    continue
+                yield row
+
+    def iter_records(self) -> Iterator[ExpenseRecord]:
+        """Lazily read every stored expense, oldest first"""
+        for row in self.iter_rows():
+            try:
+                yield ExpenseRecord.from_dict(row)
+            except Exception as e:
+                logger.warning(f"Skipping invalid expense record: {str(e)}")
+
+    def _notify(self, record: ExpenseRecord) -> None:
+        for listener in self._listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                logger.error(f"Expense listener failed: {str(e)}")
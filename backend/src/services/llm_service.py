@@ -1,5 +1,6 @@
 from src.models import ExpenseData
 from src.config import LLMConfig
+from src.singleflight import coalesced
 
 class ExpenseLLMService:
     """
@@ -15,6 +16,8 @@ class ExpenseLLMService:
         """
         return self.config.SYSTEM_PROMPT
     
+    # Identical messages in flight at once (retries, several tabs) share one completion
+    @coalesced("llm.parse_expense", key=lambda self, user_message: " ".join(user_message.lower().split()))
     def parse_expense(self, user_message: str) -> ExpenseData:
         from openai import OpenAI
         client = OpenAI(api_key=self.config.api_key)
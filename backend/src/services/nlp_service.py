@@ -3,12 +3,18 @@ Natural Language Processing service for parsing expense text
 """
 
 import re
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import date
+from typing import Dict, Any, Optional, Set, Union
 from src.models import ExpenseData, ExpenseCategory, ExpenseImportance, BankAccount, ExpenseType
+from src.services.categorizer_service import ExpenseCategorizer
+from src.services.profiling_service import stage
+from src.services.extraction_service import MONTHS, extract, local_today
 
 class ExpenseNLPService:
-    def __init__(self):
+    def __init__(self, categorizer: Optional[ExpenseCategorizer] = None):
+        # Learned from past expenses; fills in fields the text doesn't mention
+        self.categorizer = categorizer
+
         # Category keyword mapping
         self.categories = {
             ExpenseCategory.FOOD: ['snacks', 'lunch', 'dinner', 'breakfast', 'restaurant', 'coffee', 'pizza', 'burger', 'food'],
@@ -33,15 +39,26 @@ class ExpenseNLPService:
         }
 
         # Month mapping for date parsing
-        self.months = {
-            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
-            'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-            'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-        }
-
-    def parse_expense(self, text: str) -> ExpenseData:
-        """Parse natural language text into structured expense data"""
+        self.months = MONTHS
+
+    def parse_expense(self, text: str, today: Optional[date] = None) -> ExpenseData:
+        """
+        Parse natural language text into structured expense data.
+        Relative dates resolve against `today` (defaults to today in the configured timezone).
+        """
+        return self._parse(text, today)[0]
+
+    def resolve_locally(self, text: str, today: Optional[date] = None) -> Optional[ExpenseData]:
+        """
+        Parse only if the text is unambiguous enough to skip the LLM: a single clear
+        amount and a category from a keyword or from similar past expenses
+        """
+        expense, confident = self._parse(text, today)
+        return expense if confident else None
+
+    def _parse(self, text: str, today: Optional[date]):
+        today = today or local_today()
+        category_known = False
 
         # Initialize with defaults
         result = {
@@ -50,72 +67,69 @@ class ExpenseNLPService:
             'amount': 0.0,
             'importance': ExpenseImportance.NEED,
             'bank_account': BankAccount.HDFC,
-            'assigned_date': datetime.now().strftime('%Y-%m-%d'),
+            'assigned_date': today.isoformat(),
             'expense_type': ExpenseType.EXPENSE
         }
 
         text_lower = text.lower().strip()
-        tokens = re.split(r'[\s,]+', text_lower)
 
-        # Extract amount
-        amount_pattern = r'\b\d+(?:\.\d+)?\b'
-        amounts = re.findall(amount_pattern, text)
-        if amounts:
-            result['amount'] = float(amounts[0])
+        # Extract amount and date
+        extracted = extract(text_lower, today)
+        if extracted['amount'] is not None:
+            result['amount'] = extracted['amount']
+        if extracted['assigned_date'] is not None:
+            result['assigned_date'] = extracted['assigned_date']
+
+        # The name comes from what is left once the amount and date are cut out
+        remainder, position = [], 0
+        for start, end in extracted['spans']:
+            remainder.append(text_lower[position:start])
+            position = max(position, end)
+        remainder.append(text_lower[position:])
+        tokens = [token for token in re.split(r'[\s,]+', ' '.join(remainder)) if token]
 
-        # Extract date
-        result['assigned_date'] = self._extract_date(text_lower)
+        # Extract expense name
+        result['expense_name'] = self._extract_expense_name(tokens)
 
-        # Extract category
-        result['category'] = self._extract_category(text_lower)
+        # Prefer what similar past expenses used over the static defaults
+        if self.categorizer is not None:
+            with stage("categorizer.predict"):
+                prediction = self.categorizer.predict(result['expense_name'])
+            if prediction:
+                for field in ('category', 'importance', 'bank_account'):
+                    if prediction[field]['value'] is not None:
+                        result[field] = prediction[field]['value']
+                category_known = prediction['category']['value'] is not None
+
+        # Extract category; a keyword counts only as a whole word ("bus", not "business"),
+        # a substring hit is just a guess when nothing better is known
+        category = self._extract_category(set(re.findall(r'[a-z]+', text_lower)), None)
+        if category is not None:
+            result['category'] = category
+            category_known = True
+        elif not category_known:
+            result['category'] = self._extract_category(text_lower, result['category'])
 
         # Extract importance
-        result['importance'] = self._extract_importance(text_lower)
+        result['importance'] = self._extract_importance(text_lower, result['importance'])
 
         # Extract bank account
-        result['bank_account'] = self._extract_bank_account(text_lower)
+        result['bank_account'] = self._extract_bank_account(text_lower, result['bank_account'])
 
-        # Extract expense name
-        result['expense_name'] = self._extract_expense_name(tokens)
+        confident = extracted['amount_unambiguous'] and result['amount'] > 0 and category_known
+
+        # Every field was produced above from the enums, so skip re-validation
+        return ExpenseData.model_construct(**result), confident
 
-        return ExpenseData(**result)
-
-    def _extract_date(self, text: str) -> str:
-        """Extract date from text"""
-        # Handle relative dates
-        if 'today' in text:
-            return datetime.now().strftime('%Y-%m-%d')
-        elif 'yesterday' in text:
-            return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        elif 'tomorrow' in text:
-            return (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-
-        # Handle specific dates like "9 july"
-        date_pattern = r'\b(\d{1,2})\s+(\w+)\b'
-        date_match = re.search(date_pattern, text)
-        if date_match:
-            day = int(date_match.group(1))
-            month_str = date_match.group(2).lower()
-            if month_str in self.months:
-                month = self.months[month_str]
-                year = datetime.now().year
-                try:
-                    parsed_date = datetime(year, month, day)
-                    return parsed_date.strftime('%Y-%m-%d')
-                except ValueError:
-                    pass
-
-        return datetime.now().strftime('%Y-%m-%d')
-
-    def _extract_category(self, text: str) -> ExpenseCategory:
-        """Extract category from text"""
+    def _extract_category(self, text: Union[str, Set[str]], default: Optional[ExpenseCategory] = ExpenseCategory.GENERAL) -> Optional[ExpenseCategory]:
+        """Extract category from text, or from a set of its words to match whole words only"""
         for category, keywords in self.categories.items():
             for keyword in keywords:
                 if keyword in text:
                     return category
-        return ExpenseCategory.GENERAL
+        return default
 
-    def _extract_importance(self, text: str) -> ExpenseImportance:
+    def _extract_importance(self, text: str, default: ExpenseImportance = ExpenseImportance.NEED) -> ExpenseImportance:
         """Extract importance level from text"""
         importance_keywords = {
             'essential': ExpenseImportance.ESSENTIAL,
@@ -128,14 +142,14 @@ class ExpenseNLPService:
         for keyword, importance in importance_keywords.items():
             if keyword in text:
                 return importance
-        return ExpenseImportance.NEED
+        return default
 
-    def _extract_bank_account(self, text: str) -> BankAccount:
+    def _extract_bank_account(self, text: str, default: BankAccount = BankAccount.HDFC) -> BankAccount:
         """Extract bank account from text"""
         for bank_key, bank_value in self.bank_accounts.items():
             if bank_key in text:
                 return bank_value
-        return BankAccount.HDFC
+        return default
 
     def _extract_expense_name(self, tokens: list) -> str:
         """Extract expense name from tokens"""
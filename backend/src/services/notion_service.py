@@ -3,22 +3,146 @@ Notion API service for creating expense entries
 """
 
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from src.config import settings
-from src.models import ExpenseData
+from src.models import ExpenseData, ExpenseCategory, ExpenseImportance, BankAccount, ExpenseType
+from src.serialization import dumps
 import logging
 
 logger = logging.getLogger(__name__)
 
+class NotionPayloadTemplate:
+    """
+    Page payload pieces computed once per database: the property names and,
+    for every enum value, the rendered select/multi-select fragment. Building
+    a payload then only fills in the name, amount and date.
+    """
+
+    PROPERTY_NAMES = {
+        "expense_name": "Expense Name",
+        "category": "Category",
+        "amount": "Amount",
+        "importance": "Importance",
+        "bank_account": "Bank Account",
+        "assigned_date": "Assigned Date",
+        "expense_type": "Expense Type",
+    }
+    # Optional number property carrying the offline-first store's row id, so
+    # pulled pages are matched to the local row that was pushed
+    LOCAL_ID_PROPERTY = "Local ID"
+
+    def __init__(self, database_id: str, schema_properties: Optional[Dict[str, Any]] = None):
+        schema_properties = schema_properties or {}
+        by_lower_name = {name.lower(): name for name in schema_properties}
+        # Use the database's own spelling of each property when the schema is known
+        self.names = {
+            field: by_lower_name.get(default.lower(), default)
+            for field, default in self.PROPERTY_NAMES.items()
+        }
+        self.parent = {"database_id": database_id}
+        local_id_name = by_lower_name.get(self.LOCAL_ID_PROPERTY.lower())
+        self.local_id_name = local_id_name if schema_properties.get(local_id_name, {}).get("type") == "number" else None
+
+        # Existing select options, so rendered names match their spelling too
+        options_by_field = {}
+        for field in ("category", "importance", "bank_account", "expense_type"):
+            prop = schema_properties.get(self.names[field], {})
+            raw = prop.get(prop.get("type", ""), {}) or {}
+            options_by_field[field] = {opt.get("name", "").lower(): opt.get("name") for opt in raw.get("options", [])}
+
+        def render(field: str, value: str) -> str:
+            return options_by_field[field].get(value.lower(), value)
+
+        self.category = {
+            member: {"multi_select": [{"name": render("category", member.value.replace("_", " ").title())}]}
+            for member in ExpenseCategory
+        }
+        self.importance = {
+            member: {"select": {"name": render("importance", member.value.title())}}
+            for member in ExpenseImportance
+        }
+        self.bank_account = {
+            member: {"select": {"name": render("bank_account", member.value)}}
+            for member in BankAccount
+        }
+        self.expense_type = {
+            member: {"select": {"name": render("expense_type", member.value.title())}}
+            for member in ExpenseType
+        }
+
+        # Option name (lowercase) -> enum value, for reading pages back
+        self.values = {
+            "category": {frag["multi_select"][0]["name"].lower(): m.value for m, frag in self.category.items()},
+            "importance": {frag["select"]["name"].lower(): m.value for m, frag in self.importance.items()},
+            "bank_account": {frag["select"]["name"].lower(): m.value for m, frag in self.bank_account.items()},
+            "expense_type": {frag["select"]["name"].lower(): m.value for m, frag in self.expense_type.items()},
+        }
+
+    def build(self, expense: ExpenseData, local_id: Optional[int] = None) -> Dict[str, Any]:
+        """Payload for POST /v1/pages; enum fragments are shared, not copied"""
+        names = self.names
+        properties = {
+            names["expense_name"]: {"title": [{"text": {"content": expense.expense_name}}]},
+            names["category"]: self.category[expense.category],
+            names["amount"]: {"number": expense.amount},
+            names["importance"]: self.importance[expense.importance],
+            names["bank_account"]: self.bank_account[expense.bank_account],
+            names["assigned_date"]: {"date": {"start": expense.assigned_date}},
+            names["expense_type"]: self.expense_type[expense.expense_type],
+        }
+        if local_id is not None and self.local_id_name:
+            properties[self.local_id_name] = {"number": local_id}
+        return {"parent": self.parent, "properties": properties}
+
+    def local_id(self, page: Dict[str, Any]) -> Optional[int]:
+        """Local row id stored on a page, if the database has the Local ID property"""
+        if not self.local_id_name:
+            return None
+        value = page.get("properties", {}).get(self.local_id_name, {}).get("number")
+        return int(value) if value is not None else None
+
+    def parse(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ExpenseData-shaped dict from a database page, or None if it doesn't map onto an expense"""
+        properties = page.get("properties", {})
+        names = self.names
+        try:
+            title = "".join(
+                part.get("plain_text") or part.get("text", {}).get("content", "")
+                for part in properties[names["expense_name"]]["title"]
+            )
+            categories = properties[names["category"]]["multi_select"]
+            importance = properties[names["importance"]]["select"]
+            bank_account = properties[names["bank_account"]]["select"]
+            expense_type = properties.get(names["expense_type"], {}).get("select")
+            row = {
+                "expense_name": title.strip(),
+                "category": self.values["category"].get(categories[0]["name"].lower()) if categories else None,
+                "amount": properties[names["amount"]]["number"],
+                "importance": self.values["importance"].get(importance["name"].lower()) if importance else None,
+                "bank_account": self.values["bank_account"].get(bank_account["name"].lower()) if bank_account else None,
+                "assigned_date": (properties[names["assigned_date"]]["date"] or {}).get("start", "")[:10] or None,
+                "expense_type": self.values["expense_type"].get(expense_type["name"].lower()) if expense_type else ExpenseType.EXPENSE.value,
+            }
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return None
+        if not row["expense_name"] or any(value is None for value in row.values()):
+            return None
+        row["amount"] = float(row["amount"])
+        return row
+
 class NotionService:
-    def __init__(self):
-        self.token = settings.notion_token
-        self.database_id = self._format_database_id(settings.notion_database_id)
+    def __init__(self, token: Optional[str] = None, database_id: Optional[str] = None,
+                 session: Optional[requests.Session] = None):
+        self.token = token or settings.notion_token
+        self.database_id = self._format_database_id(database_id or settings.notion_database_id)
+        # A shared session keeps connections to api.notion.com pooled across requests
+        self.session = session or requests.Session()
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
+        self.template = NotionPayloadTemplate(self.database_id)
 
     def _format_database_id(self, database_id: str) -> str:
         """Format database ID to proper UUID format with hyphens"""
@@ -35,59 +159,15 @@ class NotionService:
         logger.info(f"Formatted database ID")
         return formatted_id
 
-    def create_expense_page(self, expense: ExpenseData) -> Dict[str, Any]:
+    def create_expense_page(self, expense: ExpenseData, local_id: Optional[int] = None) -> Dict[str, Any]:
         """Create a new page in the Notion database with expense data"""
 
         url = "https://api.notion.com/v1/pages"
 
-        # Construct the payload according to Notion API format
-        payload = {
-            "parent": {"database_id": self.database_id},
-            "properties": {
-                "Expense Name": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": expense.expense_name
-                            }
-                        }
-                    ]
-                },
-                "Category": {
-                    "multi_select": [
-                        {
-                            "name": expense.category.value.replace("_", " ").title()  # Handle underscores and capitalize
-                        }
-                    ]
-                },
-                "Amount": {
-                    "number": expense.amount
-                },
-                "Importance": {
-                    "select": {
-                        "name": expense.importance.value.title()  # Capitalize first letter
-                    }
-                },
-                "Bank Account": {
-                    "select": {
-                        "name": expense.bank_account.value
-                    }
-                },
-                "Assigned Date": {
-                    "date": {
-                        "start": expense.assigned_date
-                    }
-                },
-                "Expense Type": {
-                    "select": {
-                        "name": expense.expense_type.value.title()  # Capitalize first letter
-                    }
-                }
-            }
-        }
+        payload = self.template.build(expense, local_id)
 
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, data=dumps(payload), headers=self.headers)
             response.raise_for_status()
 
             result = response.json()
@@ -100,6 +180,7 @@ class NotionService:
                 "success": True,
                 "page_id": page_id,
                 "url": page_url,
+                "last_edited_time": result.get("last_edited_time", ""),
                 "message": "Expense added to Notion successfully!"
             }
 
@@ -132,7 +213,7 @@ class NotionService:
             logger.info(f"Using URL: {database_url}")
             
             # First try as database
-            response = requests.get(database_url, headers=self.headers)
+            response = self.session.get(database_url, headers=self.headers)
             
             # Log response details for debugging
             logger.info(f"Database API response status: {response.status_code}")
@@ -148,7 +229,7 @@ class NotionService:
             elif response.status_code == 400:
                 # Check if it's a page instead of database
                 logger.info("Database API failed, checking if ID is a page...")
-                page_response = requests.get(page_url, headers=self.headers)
+                page_response = self.session.get(page_url, headers=self.headers)
                 logger.info(f"Page API response status: {page_response.status_code}")
                 
                 if page_response.status_code == 200:
@@ -174,11 +255,13 @@ class NotionService:
         url = f"https://api.notion.com/v1/databases/{self.database_id}"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers)
             response.raise_for_status()
             
             result = response.json()
             properties = result.get("properties", {})
+            # Rebuild payload fragments against the database's actual property and option names
+            self.template = NotionPayloadTemplate(self.database_id, properties)
             
             # Format properties for better readability
             formatted_properties = {}
@@ -222,7 +305,7 @@ class NotionService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, json=payload, headers=self.headers)
             response.raise_for_status()
             
             result = response.json()
@@ -251,3 +334,110 @@ class NotionService:
                 "message": f"Failed to list databases: {str(e)}",
                 "databases": []
             }
+
+    def query_pages(self, edited_since: Optional[str] = None, start_cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of database entries edited at or after `edited_since`, oldest edit first"""
+        url = f"https://api.notion.com/v1/databases/{self.database_id}/query"
+
+        payload: Dict[str, Any] = {
+            "page_size": 100,
+            "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]
+        }
+        if edited_since:
+            payload["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": edited_since}}
+        if start_cursor:
+            payload["start_cursor"] = start_cursor
+
+        try:
+            response = self.session.post(url, data=dumps(payload), headers=self.headers)
+            response.raise_for_status()
+            result = response.json()
+            return {
+                "success": True,
+                "pages": result.get("results", []),
+                "next_cursor": result.get("next_cursor") if result.get("has_more") else None
+            }
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error querying Notion database: {str(e)}")
+            return {
+                "success": False,
+                "message": f"Failed to query Notion database: {str(e)}",
+                "pages": [],
+                "next_cursor": None
+            }
+
+    def find_page_by_local_id(self, local_id: int) -> Dict[str, Any]:
+        """The page pushed from local row `local_id`, if any (needs the Local ID property)"""
+        if not self.template.local_id_name:
+            return {"success": True, "page": None}
+        url = f"https://api.notion.com/v1/databases/{self.database_id}/query"
+
+        payload = {
+            "page_size": 1,
+            "filter": {"property": self.template.local_id_name, "number": {"equals": local_id}}
+        }
+
+        try:
+            response = self.session.post(url, data=dumps(payload), headers=self.headers)
+            response.raise_for_status()
+            pages = [page for page in response.json().get("results", [])
+                     if not (page.get("archived") or page.get("in_trash"))]
+            return {"success": True, "page": pages[0] if pages else None}
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error looking up Notion page for local expense {local_id}: {str(e)}")
+            return {
+                "success": False,
+                "message": f"Failed to query Notion database: {str(e)}",
+                "page": None
+            }
+
+if __name__ == "__main__":
+    # Payload build + serialization throughput: per-call dict building with
+    # stdlib json (the previous approach) vs the precomputed template
+    import json
+    import time
+    from src.serialization import orjson
+
+    template = NotionPayloadTemplate("0" * 32)
+    expenses = [
+        ExpenseData(
+            expense_name=f"expense {i}",
+            category=list(ExpenseCategory)[i % len(ExpenseCategory)],
+            amount=float(i),
+            importance=list(ExpenseImportance)[i % len(ExpenseImportance)],
+            bank_account=list(BankAccount)[i % len(BankAccount)],
+            assigned_date="2024-07-15"
+        )
+        for i in range(50_000)
+    ]
+
+    def rebuild(expense: ExpenseData) -> Dict[str, Any]:
+        return {
+            "parent": {"database_id": "0" * 32},
+            "properties": {
+                "Expense Name": {"title": [{"text": {"content": expense.expense_name}}]},
+                "Category": {"multi_select": [{"name": expense.category.value.replace("_", " ").title()}]},
+                "Amount": {"number": expense.amount},
+                "Importance": {"select": {"name": expense.importance.value.title()}},
+                "Bank Account": {"select": {"name": expense.bank_account.value}},
+                "Assigned Date": {"date": {"start": expense.assigned_date}},
+                "Expense Type": {"select": {"name": expense.expense_type.value.title()}},
+            }
+        }
+
+    for label, encode in [
+        ("rebuild + json.dumps", lambda e: json.dumps(rebuild(e)).encode()),
+        ("template + dumps", lambda e: dumps(template.build(e))),
+    ]:
+        started = time.perf_counter()
+        for expense in expenses:
+            encode(expense)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<24} {len(expenses) / elapsed:>12,.0f} payloads/s")
+    print(f"orjson available: {orjson is not None}")
+
+    assert json.loads(dumps(template.build(expenses[7]))) == rebuild(expenses[7])
+    assert template.parse(template.build(expenses[7])) == expenses[7].model_dump(mode="json")
+    with_local_id = NotionPayloadTemplate("0" * 32, {"Local ID": {"type": "number"}})
+    assert with_local_id.local_id(with_local_id.build(expenses[7], 42)) == 42
+    assert template.local_id(template.build(expenses[7], 42)) is None
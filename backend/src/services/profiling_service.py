@@ -0,0 +1,270 @@
+"""
+Opt-in request profiling: stage timings and sampled stacks for slow requests.
+
+A request is profiled when it sends an X-Profile header (if allowed), is
+picked by the sampling rate, or - when a slow-request threshold is set -
+always, keeping the report only if it ran over the threshold. Code marks
+its expensive parts with `stage(name)`; while a stage runs in a worker
+thread (e.g. `profiled` inside run_in_threadpool) a background thread
+samples that thread's stack into a ring buffer, and each report keeps the
+samples of its own threads and time spans. Stages on the event loop are
+timed but not sampled: the loop thread interleaves every in-flight
+request, so its stacks can't be attributed to one of them. With
+everything disabled the middleware is not installed and `stage` is a
+context variable lookup.
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from starlette.requests import Request
+from src.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+MAX_STACK_DEPTH = 64
+TOP_STACKS = 50
+
+class RequestProfile:
+    """Stage timings and sampled worker thread spans of one in-flight request"""
+
+    __slots__ = ("id", "method", "path", "reason", "started", "started_at", "stages", "spans")
+
+    def __init__(self, method: str, path: str, reason: Optional[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self.stages: List[Tuple[str, float, float]] = []
+        # (thread id, start, end) of every stage that ran in a worker thread
+        self.spans: List[Tuple[int, float, float]] = []
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+def _fold(frame) -> str:
+    """Root-first 'module:function:line' frames joined by ';' (collapsed stack format)"""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        frames.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+class StackSampler:
+    """
+    Background thread sampling the stacks of watched threads every `interval`
+    seconds into a bounded ring buffer of (timestamp, thread id, stack)
+    """
+
+    def __init__(self, interval: float, max_samples: int = 50_000):
+        self.interval = interval
+        self.samples: Deque[Tuple[float, int, str]] = deque(maxlen=max_samples)
+        self.watched: Counter = Counter()
+        self.users = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.users += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def release(self) -> None:
+        with self._lock:
+            self.users -= 1
+
+    def watch(self, thread_id: int) -> None:
+        with self._lock:
+            self.watched[thread_id] += 1
+
+    def unwatch(self, thread_id: int) -> None:
+        with self._lock:
+            self.watched[thread_id] -= 1
+            if self.watched[thread_id] <= 0:
+                del self.watched[thread_id]
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self.users <= 0:
+                    self._thread = None
+                    return
+                watched = list(self.watched)
+            if watched:
+                now = time.perf_counter()
+                frames = sys._current_frames()
+                for thread_id in watched:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self.samples.append((now, thread_id, _fold(frame)))
+                del frames
+            time.sleep(self.interval)
+
+    def collect(self, spans: List[Tuple[int, float, float]]) -> Counter:
+        """Stacks sampled from a thread while it ran one of `spans` (thread id, start, end)"""
+        stacks: Counter = Counter()
+        if not spans:
+            return stacks
+        first = min(start for _, start, _ in spans)
+        for timestamp, thread_id, stack in list(self.samples):
+            if timestamp >= first and any(
+                thread_id == span_thread and start <= timestamp <= end for span_thread, start, end in spans
+            ):
+                stacks[stack] += 1
+        return stacks
+
+class RequestProfiler:
+    """Decides which requests to profile and keeps the most recent reports"""
+
+    def __init__(self, header_enabled: bool, sample_rate: float, slow_request_ms: float,
+                 sample_interval_ms: float, max_reports: int):
+        self.header_enabled = header_enabled
+        self.sample_rate = sample_rate
+        self.slow_request_ms = slow_request_ms
+        self.enabled = header_enabled or sample_rate > 0 or slow_request_ms > 0
+        self.sampler = StackSampler(sample_interval_ms / 1000)
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+        if slow_request_ms > 0:
+            # Slow requests are only known to be slow at the end, so keep sampling throughout
+            self.sampler.acquire()
+
+    def _reason(self, request: Request) -> Optional[str]:
+        if self.header_enabled and request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self, request: Request) -> Optional[RequestProfile]:
+        reason = self._reason(request)
+        if reason is None and self.slow_request_ms <= 0:
+            return None
+        profile = RequestProfile(request.method, request.url.path, reason)
+        if reason is not None and self.slow_request_ms <= 0:
+            self.sampler.acquire()
+        return profile
+
+    def finish(self, profile: RequestProfile, status_code: int) -> Optional[Dict[str, Any]]:
+        ended = time.perf_counter()
+        if profile.reason is not None and self.slow_request_ms <= 0:
+            self.sampler.release()
+        total_ms = (ended - profile.started) * 1000
+        if profile.reason is None:
+            if total_ms < self.slow_request_ms:
+                return None
+            profile.reason = "slow"
+
+        stacks = self.sampler.collect(profile.spans)
+        report = {
+            "id": profile.id,
+            "method": profile.method,
+            "path": profile.path,
+            "status_code": status_code,
+            "reason": profile.reason,
+            "started_at": profile.started_at,
+            "total_ms": round(total_ms, 2),
+            "stages": [
+                {"name": name, "offset_ms": round((offset - profile.started) * 1000, 2), "duration_ms": round(duration, 2)}
+                for name, offset, duration in sorted(profile.stages, key=lambda item: item[1])
+            ],
+            "stack_profile": {
+                "interval_ms": self.sampler.interval * 1000,
+                "samples": sum(stacks.values()),
+                "stacks": [{"stack": stack, "count": count} for stack, count in stacks.most_common(TOP_STACKS)]
+            }
+        }
+        self.reports.append(report)
+        logger.info(f"Profiled {profile.method} {profile.path} ({profile.reason}): {total_ms:.1f} ms")
+        return report
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Summaries of the most recent reports, newest first"""
+        return [
+            {key: report[key] for key in ("id", "method", "path", "status_code", "reason", "started_at", "total_ms")}
+            for report in list(self.reports)[::-1][:limit]
+        ]
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        return next((report for report in self.reports if report["id"] == report_id), None)
+
+profiler = RequestProfiler(
+    settings.profiling_header_enabled,
+    settings.profiling_sample_rate,
+    settings.profiling_slow_request_ms,
+    settings.profiling_sample_interval_ms,
+    settings.profiling_max_reports
+)
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+@contextmanager
+def stage(name: str):
+    """Time a named stage of the current request if it is being profiled"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    # Worker threads (run_in_threadpool copies the context) serve this request
+    # alone while the stage runs, the event loop thread does not
+    sampled = not _on_event_loop()
+    if sampled:
+        profiler.sampler.watch(thread_id)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        profile.stages.append((name, started, (ended - started) * 1000))
+        if sampled:
+            profiler.sampler.unwatch(thread_id)
+            profile.spans.append((thread_id, started, ended))
+
+def profiled(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a blocking callable so it runs as a stage, e.g. inside run_in_threadpool"""
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+async def profiling_middleware(request: Request, call_next):
+    if not profiler.enabled:
+        return await call_next(request)
+    profile = profiler.start(request)
+    if profile is None:
+        return await call_next(request)
+    token = _current_profile.set(profile)
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        _current_profile.reset(token)
+        report = profiler.finish(profile, status_code)
+    if report is not None:
+        response.headers["X-Profile-Id"] = report["id"]
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage['name']};dur={stage['duration_ms']}" for stage in report["stages"]
+        ) or f"total;dur={report['total_ms']}"
+    return response
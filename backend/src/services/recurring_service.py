@@ -0,0 +1,175 @@
+"""
+Recurring expenses (rent, bills, SIPs, subscriptions) materialized on a schedule
+"""
+
+import asyncio
+import calendar
+import json
+import os
+import threading
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.config import settings
+from src.models import ExpenseData, RecurringExpenseRule, RecurrenceFrequency
+from src.services.extraction_service import local_today
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_months(day: date, months: int, anchor_day: int) -> date:
+    """Shift by whole months, clamping to the month end (e.g. 31 jan -> 28 feb)"""
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+def occurrences(rule: RecurringExpenseRule, until: date) -> List[date]:
+    """Occurrences after the rule's last materialized date, up to and including `until`"""
+    start = date.fromisoformat(rule.start_date)
+    if rule.end_date:
+        until = min(until, date.fromisoformat(rule.end_date))
+    after = date.fromisoformat(rule.last_materialized) if rule.last_materialized else None
+
+    due = []
+    n = 0
+    while True:
+        if rule.frequency == RecurrenceFrequency.DAILY:
+            day = start + timedelta(days=n * rule.interval)
+        elif rule.frequency == RecurrenceFrequency.WEEKLY:
+            day = start + timedelta(weeks=n * rule.interval)
+        elif rule.frequency == RecurrenceFrequency.MONTHLY:
+            day = add_months(start, n * rule.interval, start.day)
+        else:
+            day = add_months(start, 12 * n * rule.interval, start.day)
+        if day > until:
+            return due
+        if after is None or day > after:
+            due.append(day)
+        n += 1
+
+class RecurringExpenseService:
+    """
+    Stores recurring expense rules in a local JSON file and writes their due
+    occurrences. Each rule remembers the last date it was materialized, so
+    occurrences missed while the server was down are caught up on the next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._materialize_lock = asyncio.Lock()
+        self.rules: Dict[str, RecurringExpenseRule] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for raw in json.load(f):
+                    rule = RecurringExpenseRule(**raw)
+                    self.rules[rule.id] = rule
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([rule.model_dump(mode="json") for rule in self.rules.values()], f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def list_rules(self) -> List[RecurringExpenseRule]:
+        return list(self.rules.values())
+
+    def add_rule(self, rule: RecurringExpenseRule) -> RecurringExpenseRule:
+        """Store a new rule; raises KeyError if its id is already taken"""
+        with self._lock:
+            if rule.id in self.rules:
+                raise KeyError(rule.id)
+            self.rules[rule.id] = rule
+            self._save()
+        return rule
+
+    def delete_rule(self, rule_id: str) -> bool:
+        with self._lock:
+            if self.rules.pop(rule_id, None) is None:
+                return False
+            self._save()
+        return True
+
+    def due(self, today: date) -> List[ExpenseData]:
+        """All outstanding occurrences across active rules, oldest first"""
+        expenses = []
+        for rule in self.rules.values():
+            if not rule.active:
+                continue
+            for day in occurrences(rule, today):
+                expenses.append(self._to_expense(rule, day))
+        expenses.sort(key=lambda expense: expense.assigned_date)
+        return expenses
+
+    @staticmethod
+    def _to_expense(rule: RecurringExpenseRule, day: date) -> ExpenseData:
+        return ExpenseData(
+            expense_name=rule.expense_name,
+            category=rule.category,
+            amount=rule.amount,
+            importance=rule.importance,
+            bank_account=rule.bank_account,
+            assigned_date=day.isoformat(),
+            expense_type=rule.expense_type
+        )
+
+    async def materialize(
+        self,
+        write: Callable[[ExpenseData], Awaitable[Dict[str, Any]]],
+        today: Optional[date] = None,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Write due occurrences in date order, at most `batch_size` per call.
+        Stops at the first failure so the rule resumes from the same date.
+        """
+        today = today or local_today()
+        batch_size = batch_size or settings.recurring_batch_size
+        written, failed = 0, 0
+        async with self._materialize_lock:
+            for rule in list(self.rules.values()):
+                if not rule.active:
+                    continue
+                for day in occurrences(rule, today):
+                    if written >= batch_size:
+                        break
+                    result = await write(self._to_expense(rule, day))
+                    if not result.get("success", False):
+                        logger.error(f"Failed to materialize recurring expense {rule.id} for {day}: {result.get('message')}")
+                        failed += 1
+                        break
+                    written += 1
+                    with self._lock:
+                        rule.last_materialized = day.isoformat()
+                        self._save()
+        return {
+            "written": written,
+            "failed": failed,
+            "pending": len(self.due(today))
+        }
+
+async def run_recurring_scheduler(registry: Any, interval_seconds: int) -> None:
+    """
+    Background loop materializing recurring expenses for every tenant.
+    Tenants take turns one batch at a time until nobody has a backlog left.
+    """
+    while True:
+        backlog = True
+        while backlog:
+            backlog = False
+            for tenant_id in list(registry.configs):
+                try:
+                    tenant = registry.get(tenant_id)
+                    if not tenant.recurring_service.rules:
+                        continue
+                    result = await tenant.recurring_service.materialize(tenant.write_expense)
+                    if result["written"] or result["failed"]:
+                        logger.info(f"Recurring expenses for tenant {tenant_id}: {result}")
+                    if result["written"] and result["pending"] and not result["failed"]:
+                        backlog = True
+                except Exception as e:
+                    logger.error(f"Recurring scheduler failed for tenant {tenant_id}: {str(e)}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,189 @@
+"""
+In-memory search over expense names with trigram fuzzy matching
+"""
+
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict, Counter
+from typing import Dict, Any, List, Optional, Set
+from src.models import ExpenseCategory, BankAccount
+from src.records import ExpenseRecord, CATEGORY_CODES, BANK_ACCOUNT_CODES, to_epoch_day
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def trigrams(token: str) -> Set[str]:
+    """Padded trigrams, so short tokens and word starts still match"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class ExpenseSearchIndex:
+    """
+    Inverted index over expense names.
+
+    Documents are numbered in insertion order, so every posting list stays
+    sorted just by appending. Query tokens missing from the vocabulary are
+    expanded to similar indexed tokens using a trigram -> token index
+    (Dice similarity over padded trigrams).
+    Category and bank account filters are posting lists of their own; date
+    ranges are bisected on a day-ordered copy of the documents, with
+    per-day totals so a date-only query never walks its documents.
+    """
+
+    def __init__(self, fuzzy_threshold: float = 0.4):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.documents: List[ExpenseRecord] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.trigram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        self.category_postings: Dict[int, List[int]] = defaultdict(list)
+        self.account_postings: Dict[int, List[int]] = defaultdict(list)
+        # Doc ids ordered by (day, doc id), their days, and [amount, count] per day
+        self.day_order: List[int] = []
+        self.day_order_days: List[int] = []
+        self.days: List[int] = []
+        self.day_totals: Dict[int, List[float]] = {}
+        self.total_amount = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, record: ExpenseRecord) -> None:
+        """Index a single expense"""
+        with self._lock:
+            doc_id = len(self.documents)
+            self.documents.append(record)
+            for token in set(tokenize(record.name)):
+                if token not in self.postings:
+                    for gram in trigrams(token):
+                        self.trigram_tokens[gram].add(token)
+                self.postings[token].append(doc_id)
+            self.category_postings[record.category].append(doc_id)
+            self.account_postings[record.bank_account].append(doc_id)
+            # Usually appends: new expenses mostly carry recent dates
+            position = bisect_right(self.day_order_days, record.day)
+            self.day_order.insert(position, doc_id)
+            self.day_order_days.insert(position, record.day)
+            totals = self.day_totals.get(record.day)
+            if totals is None:
+                totals = self.day_totals[record.day] = [0.0, 0]
+                insort(self.days, record.day)
+            totals[0] += record.amount
+            totals[1] += 1
+            self.total_amount += record.amount
+
+    def expand_token(self, token: str) -> List[str]:
+        """Indexed tokens matching a query token, exactly or by trigram similarity"""
+        if token in self.postings:
+            return [token]
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            for candidate in self.trigram_tokens.get(gram, ()):
+                shared[candidate] += 1
+        matches = []
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if similarity >= self.fuzzy_threshold:
+                matches.append(candidate)
+        return matches
+
+    def search(
+        self,
+        query: str = "",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        category: Optional[ExpenseCategory] = None,
+        bank_account: Optional[BankAccount] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Find expenses whose names match every query token (AND semantics),
+        newest first. Dates are inclusive YYYY-MM-DD bounds.
+        """
+        category_code = CATEGORY_CODES[category] if category is not None else None
+        account_code = BANK_ACCOUNT_CODES[bank_account] if bank_account is not None else None
+        first_day = to_epoch_day(start_date) if start_date else None
+        last_day = to_epoch_day(end_date) if end_date else None
+
+        # Every source is a list of doc ids in ascending order
+        sources: List[List[int]] = []
+        expanded: Dict[str, List[str]] = {}
+        for token in set(tokenize(query)):
+            matches = self.expand_token(token)
+            expanded[token] = matches
+            if len(matches) == 1:
+                sources.append(self.postings[matches[0]])
+            else:
+                sources.append(sorted({doc_id for match in matches for doc_id in self.postings[match]}))
+        if category_code is not None:
+            sources.append(self.category_postings.get(category_code, []))
+        if account_code is not None:
+            sources.append(self.account_postings.get(account_code, []))
+
+        with self._lock:
+            dated = first_day is not None or last_day is not None
+            low = bisect_left(self.day_order_days, first_day) if first_day is not None else 0
+            high = bisect_right(self.day_order_days, last_day) if last_day is not None else len(self.day_order)
+            high = max(high, low)
+
+            if not sources:
+                # Only dates (or nothing): count and total from per-day aggregates
+                if not dated:
+                    total_matches, total_amount = len(self.documents), self.total_amount
+                    newest = range(len(self.documents) - 1, max(len(self.documents) - limit, 0) - 1, -1)
+                else:
+                    total_matches, total_amount = high - low, 0.0
+                    day_low = bisect_left(self.days, first_day) if first_day is not None else 0
+                    day_high = bisect_right(self.days, last_day) if last_day is not None else len(self.days)
+                    for i in range(day_low, day_high):
+                        total_amount += self.day_totals[self.days[i]][0]
+                    newest = sorted(self.day_order[low:high], reverse=True)[:limit] if limit > 0 else []
+                return {
+                    "total_matches": total_matches,
+                    "total_amount": round(total_amount, 2),
+                    "expanded_tokens": expanded,
+                    "results": [self.documents[doc_id] for doc_id in newest]
+                }
+
+            sources.sort(key=len)
+            driver, others = sources[0], sources[1:]
+            check_dates = dated
+            if dated and high - low < len(driver):
+                # The date range is the most selective source
+                others = sources
+                driver = sorted(self.day_order[low:high])
+                check_dates = False
+
+            documents = self.documents
+            # Walk the driver newest first; the others are bisected below a bound
+            # that only shrinks, since doc ids only go down
+            bounds = [len(other) for other in others]
+            results = []
+            total_matches = 0
+            total_amount = 0.0
+            for doc_id in reversed(driver):
+                matched = True
+                for i, other in enumerate(others):
+                    position = bisect_right(other, doc_id, 0, bounds[i])
+                    bounds[i] = position
+                    if position == 0 or other[position - 1] != doc_id:
+                        matched = False
+                        break
+                if not matched:
+                    continue
+                record = documents[doc_id]
+                if check_dates and ((first_day is not None and record.day < first_day) or
+                                    (last_day is not None and record.day > last_day)):
+                    continue
+                total_matches += 1
+                total_amount += record.amount
+                if len(results) < limit:
+                    results.append(record)
+
+        return {
+            "total_matches": total_matches,
+            "total_amount": round(total_amount, 2),
+            "expanded_tokens": expanded,
+            "results": results
+        }
@@ -0,0 +1,345 @@
+"""
+Offline-first expense store: SQLite is the system of record and Notion an
+asynchronously replicated sink (see sync_service)
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.models import ExpenseData
+from src.records import ExpenseRecord
+from src.serialization import dumps, loads
+from src.services.expense_store import ExpenseStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("expense_name", "category", "amount", "importance", "bank_account", "assigned_date", "expense_type")
+
+PENDING = "pending"
+SYNCED = "synced"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    expense_name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    importance TEXT NOT NULL,
+    bank_account TEXT NOT NULL,
+    assigned_date TEXT NOT NULL,
+    expense_type TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    sync_state TEXT NOT NULL DEFAULT 'pending',
+    notion_page_id TEXT UNIQUE,
+    notion_url TEXT,
+    notion_edited_time TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (assigned_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses (category, assigned_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_account ON expenses (bank_account, assigned_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_pending ON expenses (next_attempt_at) WHERE sync_state = 'pending';
+
+CREATE TABLE IF NOT EXISTS sync_conflicts (
+    id INTEGER PRIMARY KEY,
+    expense_id INTEGER NOT NULL,
+    notion_page_id TEXT NOT NULL,
+    local_version TEXT NOT NULL,
+    notion_version TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    detected_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+READ_BATCH_SIZE = 1000
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+class SQLiteExpenseStore(ExpenseStore):
+    """
+    ExpenseStore backed by SQLite (WAL mode) with indexes on date, category
+    and bank account. Every write lands here first as `pending` and is pushed
+    to Notion later; pages edited or created in Notion are pulled back in.
+    A Notion edit wins over the local row, and the overwritten local version
+    is kept in `sync_conflicts`.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit; each write is a single statement or an explicit transaction
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def add(self, expense: ExpenseData) -> int:
+        """Insert an expense as pending replication; returns its local id"""
+        row = expense.model_dump(mode="json")
+        now = _utc_now()
+        with self._lock:
+            self.load()
+            cursor = self._db.execute(
+                f"INSERT INTO expenses ({', '.join(FIELDS)}, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*(row[field] for field in FIELDS), now, now)
+            )
+            self._notify(ExpenseRecord.from_expense_data(expense))
+        return cursor.lastrowid
+
+    def import_rows(self, rows: Iterable[Dict[str, Any]], sync_state: str = SYNCED) -> int:
+        """
+        Bulk insert ExpenseData-shaped dicts without notifying listeners (e.g. migrating
+        the JSON-lines store). Imported rows get linked to their Notion pages on the next pull.
+        """
+        now = _utc_now()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                cursor = self._db.executemany(
+                    f"INSERT INTO expenses ({', '.join(FIELDS)}, created_at, updated_at, sync_state) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((*(row.get(field, "expense") if field == "expense_type" else row[field] for field in FIELDS),
+                      now, now, sync_state) for row in rows)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM expenses").fetchone()[0]
+
+    def iter_rows(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  category: Optional[str] = None, bank_account: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stored expenses as ExpenseData-shaped dicts, oldest first, read in
+        batches so long exports don't hold the store lock
+        """
+        conditions, params = ["id > ?"], []
+        for column, op, value in (("assigned_date", ">=", start_date), ("assigned_date", "<=", end_date),
+                                  ("category", "=", category), ("bank_account", "=", bank_account)):
+            if value:
+                conditions.append(f"{column} {op} ?")
+                params.append(value)
+        query = f"SELECT id, {', '.join(FIELDS)} FROM expenses WHERE {' AND '.join(conditions)} ORDER BY id LIMIT {READ_BATCH_SIZE}"
+        last_id = 0
+        while True:
+            with self._lock:
+                batch = self._db.execute(query, (last_id, *params)).fetchall()
+            for row in batch:
+                yield dict(zip(FIELDS, row[1:]))
+            if len(batch) < READ_BATCH_SIZE:
+                return
+            last_id = batch[-1][0]
+
+    def _rows_after(self, count: int) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(FIELDS)} FROM expenses ORDER BY id LIMIT -1 OFFSET ?", (count,)
+            ).fetchall()
+        return (dict(zip(FIELDS, row)) for row in rows)
+
+    # Replication
+
+    def pending(self, limit: int) -> List[Tuple[int, ExpenseData]]:
+        """Expenses due for a push to Notion, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, {', '.join(FIELDS)} FROM expenses "
+                "WHERE sync_state = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return [(row[0], ExpenseRecord.from_dict(dict(zip(FIELDS, row[1:]))).to_expense_data()) for row in rows]
+
+    def mark_synced(self, expense_id: int, page_id: str, url: str, edited_time: Optional[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE expenses SET sync_state = 'synced', notion_page_id = ?, notion_url = ?, "
+                "notion_edited_time = ?, last_error = NULL WHERE id = ?",
+                (page_id, url, edited_time, expense_id)
+            )
+
+    def mark_failed(self, expense_id: int, error: str, retry_in: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE expenses SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + retry_in, error, expense_id)
+            )
+
+    def attempts(self, expense_id: int) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM expenses WHERE id = ?", (expense_id,)).fetchone()
+        return row[0] if row else 0
+
+    def apply_remote(self, page_id: str, url: str, edited_time: str, row: Dict[str, Any],
+                     local_id: Optional[int] = None) -> str:
+        """
+        Reconcile one page read from Notion. Returns "unchanged", "updated"
+        (a Notion edit overwrote the local row), "linked" (the page is an
+        unlinked local row, e.g. a push whose response was lost), "duplicate"
+        (a second page pushed from a row already linked to another one, kept
+        in `sync_conflicts` rather than counted twice) or "imported"
+        """
+        values = tuple(row[field] for field in FIELDS)
+        now = _utc_now()
+        with self._lock:
+            self.load()
+            columns = f"id, notion_edited_time, {', '.join(FIELDS)}"
+            local = self._db.execute(f"SELECT {columns} FROM expenses WHERE notion_page_id = ?", (page_id,)).fetchone()
+            linked = False
+            if local is None:
+                if local_id is not None:
+                    # The page says which local row it was pushed from
+                    local = self._db.execute(
+                        f"SELECT {columns}, notion_page_id FROM expenses WHERE id = ?", (local_id,)
+                    ).fetchone()
+                    if local is not None and local[-1] is not None:
+                        # A retried push created another page before this one was pulled
+                        return self._record_duplicate(local[0], page_id, dict(zip(FIELDS, local[2:-1])), row, now)
+                    local = local[:-1] if local is not None else None
+                else:
+                    # Without a Local ID property, only rows that may already be in Notion can
+                    # match: a push attempted before (its response may have been lost) or a
+                    # migrated row. A row never pushed is a genuine duplicate of the page.
+                    local = self._db.execute(
+                        f"SELECT {columns} FROM expenses WHERE notion_page_id IS NULL "
+                        "AND (sync_state = 'synced' OR attempts > 0) "
+                        "AND expense_name = ? AND amount = ? AND assigned_date = ? ORDER BY id LIMIT 1",
+                        (row["expense_name"], row["amount"], row["assigned_date"])
+                    ).fetchone()
+                if local is not None:
+                    # Already in the views, which only change below if the page differs
+                    self.mark_synced(local[0], page_id, url, None)
+                    linked = True
+            if local is not None:
+                expense_id, local_edited_time, local_values = local[0], local[1], tuple(local[2:])
+                # last_edited_time has minute granularity: an equal timestamp may
+                # still be a newer edit, which the values below tell apart
+                if local_edited_time and edited_time < local_edited_time:
+                    return "unchanged"
+                if local_values == values:
+                    self._db.execute("UPDATE expenses SET notion_edited_time = ? WHERE id = ?", (edited_time, expense_id))
+                    return "linked" if linked else "unchanged"
+                self._db.execute("BEGIN")
+                try:
+                    self._db.execute(
+                        "INSERT INTO sync_conflicts (expense_id, notion_page_id, local_version, notion_version, resolution, detected_at) "
+                        "VALUES (?, ?, ?, ?, 'notion_applied', ?)",
+                        (expense_id, page_id, dumps(dict(zip(FIELDS, local_values))).decode("utf-8"),
+                         dumps(row).decode("utf-8"), now)
+                    )
+                    self._db.execute(
+                        f"UPDATE expenses SET {', '.join(f'{field} = ?' for field in FIELDS)}, "
+                        "updated_at = ?, notion_edited_time = ? WHERE id = ?",
+                        (*values, now, edited_time, expense_id)
+                    )
+                    self._db.execute("COMMIT")
+                    self._edits += 1
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+                logger.info(f"Applied Notion edit of page {page_id} to local expense {expense_id}")
+                return "updated"
+
+            self._db.execute(
+                f"INSERT INTO expenses ({', '.join(FIELDS)}, created_at, updated_at, sync_state, "
+                "notion_page_id, notion_url, notion_edited_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'synced', ?, ?, ?)",
+                (*values, now, now, page_id, url, edited_time)
+            )
+            self._notify(ExpenseRecord.from_dict(row))
+            return "imported"
+
+    def _record_duplicate(self, expense_id: int, page_id: str, local_row: Dict[str, Any],
+                          row: Dict[str, Any], now: str) -> str:
+        """Keep a duplicate page out of the expenses, once per page (caller holds the lock)"""
+        seen = self._db.execute(
+            "SELECT 1 FROM sync_conflicts WHERE notion_page_id = ? AND resolution = 'duplicate'", (page_id,)
+        ).fetchone()
+        if seen:
+            return "unchanged"
+        self._db.execute(
+            "INSERT INTO sync_conflicts (expense_id, notion_page_id, local_version, notion_version, resolution, detected_at) "
+            "VALUES (?, ?, ?, ?, 'duplicate', ?)",
+            (expense_id, page_id, dumps(local_row).decode("utf-8"), dumps(row).decode("utf-8"), now)
+        )
+        logger.warning(f"Notion page {page_id} duplicates local expense {expense_id}; not imported")
+        return "duplicate"
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM sync_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sync_meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def sync_status(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT sync_state, COUNT(*) FROM expenses GROUP BY sync_state").fetchall())
+            oldest_pending, last_error = self._db.execute(
+                "SELECT MIN(created_at), (SELECT last_error FROM expenses WHERE sync_state = 'pending' "
+                "AND last_error IS NOT NULL ORDER BY id DESC LIMIT 1) FROM expenses WHERE sync_state = 'pending'"
+            ).fetchone()
+            conflicts = self._db.execute("SELECT COUNT(*) FROM sync_conflicts").fetchone()[0]
+        return {
+            "pending": counts.get(PENDING, 0),
+            "synced": counts.get(SYNCED, 0),
+            "oldest_pending": oldest_pending,
+            "last_error": last_error,
+            "conflicts": conflicts,
+            "last_pull": self.get_meta("pull_cursor")
+        }
+
+    def conflicts(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent Notion edits that overwrote a local version, and duplicate pages left out, newest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT expense_id, notion_page_id, local_version, notion_version, resolution, detected_at "
+                "FROM sync_conflicts ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{
+            "expense_id": expense_id,
+            "notion_page_id": page_id,
+            "local_version": loads(local_version),
+            "notion_version": loads(notion_version),
+            "resolution": resolution,
+            "detected_at": detected_at
+        } for expense_id, page_id, local_version, notion_version, resolution, detected_at in rows]
+
+if __name__ == "__main__":
+    # Local write latency
+    import tempfile
+
+    store = SQLiteExpenseStore(os.path.join(tempfile.mkdtemp(), "expenses.db"))
+    expense = ExpenseData(expense_name="coffee", category="food", amount=50.0, importance="want",
+                          bank_account="HDFC", assigned_date="2024-07-19", expense_type="expense")
+    timings = []
+    for _ in range(2000):
+        started = time.perf_counter()
+        store.add(expense)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"add: p50 {timings[len(timings) // 2]:.3f} ms, p99 {timings[int(len(timings) * 0.99)]:.3f} ms")
+    started = time.perf_counter()
+    rows = sum(1 for _ in store.iter_rows("2024-07-01", "2024-07-31"))
+    print(f"range read: {rows} rows in {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -0,0 +1,139 @@
+"""
+Background replication between offline-first local stores and Notion
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Set
+from starlette.concurrency import run_in_threadpool
+import logging
+
+logger = logging.getLogger(__name__)
+
+PULL_CURSOR = "pull_cursor"
+
+_wakeup: Optional[asyncio.Event] = None
+_schema_loaded: Set[str] = set()
+
+def request_sync() -> None:
+    """Wake the sync loop now, e.g. right after a local write"""
+    if _wakeup is not None:
+        _wakeup.set()
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff between pushes of a failing expense, capped at an hour"""
+    return min(5 * 2 ** attempts, 3600)
+
+async def load_schema(tenant: Any) -> None:
+    """Read the database schema once per tenant, for its property and option spellings"""
+    if tenant.tenant_id not in _schema_loaded:
+        schema = await tenant.call_notion(tenant.notion_service.get_database_schema)
+        if schema.get("success", False):
+            _schema_loaded.add(tenant.tenant_id)
+
+async def push_pending(tenant: Any, batch_size: int) -> Dict[str, int]:
+    """
+    Create Notion pages for up to `batch_size` pending local expenses, tagged
+    with their local id when the database has a Local ID property. Before a
+    retry, Notion is asked for a page already carrying that id (the previous
+    push may have succeeded with its response lost) and the row is linked to it.
+    """
+    store = tenant.expense_store
+    pushed = failed = 0
+    await load_schema(tenant)
+    for expense_id, expense in store.pending(batch_size):
+        result = None
+        if store.attempts(expense_id):
+            found = await tenant.call_notion(tenant.notion_service.find_page_by_local_id, expense_id)
+            if not found["success"]:
+                result = found
+            elif found["page"] is not None:
+                result = {"success": True, "page_id": found["page"]["id"], "url": found["page"].get("url", ""),
+                          "last_edited_time": found["page"].get("last_edited_time", "")}
+        if result is None:
+            result = await tenant.call_notion(tenant.notion_service.create_expense_page, expense, expense_id)
+        if result.get("success", False):
+            store.mark_synced(expense_id, result.get("page_id") or None, result.get("url", ""),
+                              result.get("last_edited_time") or None)
+            pushed += 1
+        else:
+            store.mark_failed(expense_id, result.get("message", ""), retry_delay(store.attempts(expense_id)))
+            failed += 1
+            # Notion is down or rejecting writes; leave the rest for the next round
+            break
+    return {"pushed": pushed, "failed": failed, "pending": store.sync_status()["pending"]}
+
+async def pull_changes(tenant: Any) -> Dict[str, int]:
+    """
+    Apply pages created or edited in Notion since the last pull to the local
+    store. Derived views are rebuilt when an existing expense changed.
+    """
+    store = tenant.expense_store
+    await load_schema(tenant)
+
+    since = store.get_meta(PULL_CURSOR)
+    newest = since
+    counts: Counter = Counter()
+    start_cursor = None
+    while True:
+        result = await tenant.call_notion(tenant.notion_service.query_pages, since, start_cursor)
+        if not result["success"]:
+            counts["errors"] += 1
+            break
+        for page in result["pages"]:
+            if page.get("archived") or page.get("in_trash"):
+                continue
+            template = tenant.notion_service.template
+            row = template.parse(page)
+            if row is None:
+                counts["skipped"] += 1
+                continue
+            edited_time = page.get("last_edited_time", "")
+            counts[store.apply_remote(page["id"], page.get("url", ""), edited_time, row, template.local_id(page))] += 1
+            newest = max(newest or "", edited_time)
+        start_cursor = result["next_cursor"]
+        if not start_cursor:
+            break
+
+    if not counts["errors"] and newest:
+        store.set_meta(PULL_CURSOR, newest)
+    if counts["updated"]:
+        await run_in_threadpool(tenant.rebuild_views)
+    return dict(counts)
+
+async def run_notion_sync(registry: Any, interval_seconds: int, pull_interval_seconds: int, batch_size: int) -> None:
+    """
+    Background loop replicating every offline-first tenant. Pending writes are
+    pushed round-robin one batch per tenant until no backlog is left; Notion
+    edits are pulled every `pull_interval_seconds`. Local writes wake the loop.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    last_pull: Dict[str, float] = {}
+    while True:
+        _wakeup.clear()
+        backlog = True
+        while backlog:
+            backlog = False
+            for tenant_id in list(registry.configs):
+                try:
+                    tenant = registry.get(tenant_id)
+                    if not tenant.offline_first:
+                        continue
+                    result = await push_pending(tenant, batch_size)
+                    if result["pushed"] or result["failed"]:
+                        logger.info(f"Notion sync for tenant {tenant_id}: {result}")
+                    if result["pushed"] and result["pending"] and not result["failed"]:
+                        backlog = True
+                    if time.monotonic() - last_pull.get(tenant_id, float("-inf")) >= pull_interval_seconds:
+                        last_pull[tenant_id] = time.monotonic()
+                        changes = await pull_changes(tenant)
+                        if any(changes.get(key) for key in ("updated", "linked", "duplicate", "imported", "errors")):
+                            logger.info(f"Notion pull for tenant {tenant_id}: {changes}")
+                except Exception as e:
+                    logger.error(f"Notion sync failed for tenant {tenant_id}: {str(e)}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
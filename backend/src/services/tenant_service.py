@@ -0,0 +1,312 @@
+"""
+Tenant resolution, authentication and fair scheduling of Notion calls across tenants
+"""
+
+import asyncio
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+import requests
+from fastapi import Header, HTTPException
+from requests.adapters import HTTPAdapter
+from starlette.concurrency import run_in_threadpool
+from src.config import settings
+from src.services.notion_service import NotionService
+from src.services.expense_store import ExpenseStore
+from src.services.sqlite_store import SQLiteExpenseStore, SYNCED
+from src.services.budget_service import BudgetService
+from src.services.search_service import ExpenseSearchIndex
+from src.services.analytics_service import ExpenseAnalytics, ExpenseQueryParser, QueryAnsweringService
+from src.services.recurring_service import RecurringExpenseService
+from src.services.categorizer_service import ExpenseCategorizer
+from src.services.profiling_service import stage, profiled
+from src.services.sync_service import request_sync
+from src.singleflight import async_flight
+from src.models import ExpenseData
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Async token bucket limiting the request rate of a single tenant"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class FairScheduler:
+    """
+    Admits upstream calls round-robin across tenants.
+
+    At most `max_concurrency` calls run at once and each tenant holds at most
+    `per_tenant` of them, so a tenant with a deep queue (e.g. a bulk import)
+    only ever takes its turn instead of starving everyone else.
+    """
+
+    def __init__(self, max_concurrency: int, per_tenant: int):
+        self.max_concurrency = max_concurrency
+        self.per_tenant = per_tenant
+        self.active = 0
+        self.tenant_active: Dict[str, int] = defaultdict(int)
+        self.waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(tenant_id, deque()).append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before cancellation, give the slot back
+                self._release(tenant_id)
+            else:
+                self._discard(tenant_id, future)
+            raise
+        try:
+            yield
+        finally:
+            self._release(tenant_id)
+
+    def _dispatch(self) -> None:
+        while self.active < self.max_concurrency:
+            tenant_id = next(
+                (t for t in self.waiting if self.tenant_active[t] < self.per_tenant), None
+            )
+            if tenant_id is None:
+                return
+            queue = self.waiting.pop(tenant_id)
+            future = queue.popleft()
+            if queue:
+                # Re-queue at the back so other tenants go first next time
+                self.waiting[tenant_id] = queue
+            if future.done():
+                continue
+            self.active += 1
+            self.tenant_active[tenant_id] += 1
+            future.set_result(None)
+
+    def _release(self, tenant_id: str) -> None:
+        self.active -= 1
+        self.tenant_active[tenant_id] -= 1
+        self._dispatch()
+
+    def _discard(self, tenant_id: str, future: asyncio.Future) -> None:
+        queue = self.waiting.get(tenant_id)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self.waiting[tenant_id]
+
+notion_scheduler = FairScheduler(settings.notion_max_concurrency, settings.notion_tenant_concurrency)
+
+# Idempotent NotionService reads coalesced per tenant in call_notion
+COALESCED_READS = ("test_connection", "get_database_schema", "list_databases")
+
+class TenantContext:
+    """Everything owned by one tenant: Notion client, rate budget and local state"""
+
+    def __init__(self, tenant_id: str, config: Dict[str, Any]):
+        self.check_config(tenant_id, config)
+        self.tenant_id = tenant_id
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.notion_tenant_concurrency)
+        session.mount("https://", adapter)
+        self.notion_service = NotionService(config.get("notion_token"), config.get("notion_database_id"), session)
+        self.rate_limiter = TokenBucket(settings.notion_requests_per_second, settings.notion_burst)
+
+        self.config = config
+        self.offline_first = config.get("offline_first", settings.offline_first)
+        store_path = config.get("expense_store_path") or self._store_path(tenant_id)
+        if self.offline_first:
+            self.expense_store = self._open_local_store(store_path)
+        else:
+            self.expense_store = ExpenseStore(store_path)
+        self._build_views()
+        self.recurring_service = RecurringExpenseService(
+            os.path.join(os.path.dirname(self.expense_store.path), "recurring.json")
+        )
+
+    @staticmethod
+    def check_config(tenant_id: str, config: Dict[str, Any]) -> None:
+        """
+        Only the default tenant may fall back to the top-level Notion settings;
+        anyone else missing credentials would silently write to its database
+        """
+        if tenant_id == settings.default_tenant_id:
+            return
+        missing = [key for key in ("notion_token", "notion_database_id", "api_key") if not config.get(key)]
+        if missing:
+            raise ValueError(f"Tenant {tenant_id} is missing {', '.join(missing)}")
+
+    @staticmethod
+    def _store_path(tenant_id: str) -> str:
+        if tenant_id == settings.default_tenant_id:
+            return settings.expense_store_path
+        directory, filename = os.path.split(settings.expense_store_path)
+        return os.path.join(directory, tenant_id, filename)
+
+    @staticmethod
+    def _open_local_store(jsonl_path: str) -> SQLiteExpenseStore:
+        """SQLite store next to the JSON-lines log, seeded from it on first use"""
+        store = SQLiteExpenseStore(os.path.splitext(jsonl_path)[0] + ".db")
+        if store.count() == 0 and os.path.exists(jsonl_path):
+            # Those expenses were only logged after Notion accepted them
+            imported = store.import_rows(ExpenseStore(jsonl_path).iter_rows(), SYNCED)
+            logger.info(f"Imported {imported} expenses from {jsonl_path}")
+        return store
+
+    def _build_views(self, replay: bool = False) -> None:
+        """Create budgets, search/analytics indexes and the categorizer, fed by the store"""
+        while True:
+            budget_service = BudgetService(
+                self.config.get("category_budgets", settings.category_budgets),
+                self.config.get("importance_budgets", settings.importance_budgets)
+            )
+            search_index = ExpenseSearchIndex()
+            analytics = ExpenseAnalytics()
+            categorizer = ExpenseCategorizer()
+            if self.expense_store.replace_listeners(
+                [budget_service.record, search_index.add, analytics.record, categorizer.add], replay=replay
+            ):
+                break
+            logger.info(f"Expenses of tenant {self.tenant_id} were edited during replay, rebuilding again")
+        self.budget_service = budget_service
+        self.search_index = search_index
+        self.analytics = analytics
+        self.categorizer = categorizer
+        self.query_service = QueryAnsweringService(analytics, search_index, ExpenseQueryParser())
+
+    def rebuild_views(self) -> None:
+        """Rebuild derived views from the store, e.g. after expenses were edited in Notion"""
+        self._build_views(replay=True)
+        logger.info(f"Rebuilt views for tenant {self.tenant_id}")
+
+    async def call_notion(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking NotionService call within this tenant's rate and fair-share
+        budget. Concurrent identical reads share one call (and one unit of budget);
+        get_database_schema also refreshes the client's payload template.
+        """
+        if func.__name__ in COALESCED_READS:
+            flight = async_flight(f"notion.{func.__name__}")
+            return await flight.do((self.tenant_id,) + args, self._call_notion, func, *args)
+        return await self._call_notion(func, *args)
+
+    async def _call_notion(self, func: Callable[..., Any], *args: Any) -> Any:
+        with stage("notion.rate_limit"):
+            await self.rate_limiter.acquire()
+        async with notion_scheduler.slot(self.tenant_id):
+            return await run_in_threadpool(profiled(f"notion.{func.__name__}", func), *args)
+
+    async def write_expense(self, expense: ExpenseData) -> Dict[str, Any]:
+        """
+        Record an expense. Offline-first tenants write it locally and replicate
+        it to Notion in the background; otherwise the Notion page is created
+        first and the expense is recorded locally on success.
+        """
+        if self.offline_first:
+            with stage("store.add"):
+                expense_id = self.expense_store.add(expense)
+            request_sync()
+            return {
+                "success": True,
+                "page_id": "",
+                "url": "",
+                "local_id": expense_id,
+                "sync_state": "pending",
+                "message": "Expense saved locally, it will be synced to Notion shortly"
+            }
+        result = await self.call_notion(self.notion_service.create_expense_page, expense)
+        if result.get("success", False):
+            with stage("store.add"):
+                self.expense_store.add(expense)
+        return result
+
+class TenantRegistry:
+    """Resolves tenant ids and API keys to lazily created, cached tenant contexts"""
+
+    def __init__(self, tenants: Dict[str, Dict[str, Any]]):
+        self.configs = dict(tenants)
+        self.configs.setdefault(settings.default_tenant_id, {
+            "notion_token": settings.notion_token,
+            "notion_database_id": settings.notion_database_id,
+            "api_key": settings.default_tenant_api_key
+        })
+        # Keys are looked up by digest, so the lookup time says nothing about the key
+        self.api_keys: Dict[str, str] = {}
+        for tenant_id, config in self.configs.items():
+            TenantContext.check_config(tenant_id, config)
+            if config.get("api_key"):
+                digest = self._digest(config["api_key"])
+                if digest in self.api_keys:
+                    raise ValueError(f"Tenants {self.api_keys[digest]} and {tenant_id} share an API key")
+                self.api_keys[digest] = tenant_id
+        self.contexts: Dict[str, TenantContext] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    def authenticate(self, api_key: Optional[str], tenant_id: Optional[str] = None) -> TenantContext:
+        """
+        The tenant owning `api_key`. Requests without a key get the default
+        tenant, unless it has a key of its own. A claimed `tenant_id` (the
+        X-Tenant-ID header) is only a hint and must match the key's tenant.
+        Raises PermissionError otherwise.
+        """
+        if api_key:
+            owner = self.api_keys.get(self._digest(api_key))
+            if owner is None or not secrets.compare_digest(api_key, self.configs[owner]["api_key"]):
+                raise PermissionError("Invalid API key")
+        else:
+            owner = settings.default_tenant_id
+            if self.configs[owner].get("api_key"):
+                raise PermissionError("Missing API key")
+        if tenant_id and tenant_id != owner:
+            raise PermissionError(f"API key is not valid for tenant {tenant_id}")
+        return self.get(owner)
+
+    def get(self, tenant_id: Optional[str] = None) -> TenantContext:
+        tenant_id = tenant_id or settings.default_tenant_id
+        context = self.contexts.get(tenant_id)
+        if context is not None:
+            return context
+        if tenant_id not in self.configs:
+            raise KeyError(tenant_id)
+        with self._lock:
+            if tenant_id not in self.contexts:
+                context = TenantContext(tenant_id, self.configs[tenant_id])
+                context.expense_store.load()
+                self.contexts[tenant_id] = context
+                logger.info(f"Initialized tenant {tenant_id}")
+        return self.contexts[tenant_id]
+
+tenant_registry = TenantRegistry(settings.tenants)
+
+def get_tenant(x_api_key: Optional[str] = Header(None), x_tenant_id: Optional[str] = Header(None)) -> TenantContext:
+    """Route dependency: the tenant authenticated by the X-API-Key header"""
+    try:
+        return tenant_registry.authenticate(x_api_key, x_tenant_id)
+    except PermissionError as e:
+        raise HTTPException(status_code=401, detail=str(e))
@@ -0,0 +1,127 @@
+"""
+Single-flight coalescing of identical concurrent upstream calls.
+
+While a call for a key is in flight, callers with the same key wait for
+it and share its result (or exception) instead of calling upstream again.
+Shared results are the same object for every caller, so treat them as
+read-only. `SingleFlight` is safe to use from threadpool workers;
+`AsyncSingleFlight` coalesces coroutines on the event loop, so waiting
+callers don't hold a worker thread or any budget taken after it.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+class SingleFlight:
+    """In-flight calls of one operation, keyed by normalized input, with counters"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.inflight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self.calls += 1
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self.failures += 1
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self.inflight[key]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "upstream_calls": self.executed,
+            "saved_upstream_calls": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self.inflight)
+        }
+
+class AsyncSingleFlight(SingleFlight):
+    """In-flight coroutine calls of one operation, for callers on a single event loop"""
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        self.calls += 1
+        task = self.inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = self.inflight[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        # Shielded, so a caller that gives up doesn't cancel the call the others wait for
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        del self.inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            self.failures += 1
+
+flights: Dict[str, SingleFlight] = {}
+
+def coalesced(name: str, key: Callable[..., Hashable]):
+    """
+    Decorate a blocking function so concurrent calls with the same
+    `key(*args, **kwargs)` run it once
+    """
+    flight = flights.setdefault(name, SingleFlight(name))
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return flight.do(key(*args, **kwargs), func, *args, **kwargs)
+        wrapper.single_flight = flight
+        return wrapper
+    return decorator
+
+def async_flight(name: str) -> AsyncSingleFlight:
+    """The named coroutine single-flight group, created on first use"""
+    if name not in flights:
+        flights[name] = AsyncSingleFlight(name)
+    return flights[name]
+
+def coalescing_stats() -> List[Dict[str, Any]]:
+    return [flight.stats() for flight in flights.values()]
+
+if __name__ == "__main__":
+    # 50 concurrent identical calls against a slow upstream
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    @coalesced("demo", key=lambda text: " ".join(text.lower().split()))
+    def slow_upstream(text: str) -> str:
+        time.sleep(0.2)
+        return text.upper()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        results = list(pool.map(slow_upstream, ["coffee 50"] * 25 + ["Coffee  50"] * 25))
+    elapsed = time.perf_counter() - started
+    assert len(set(results)) == 1
+    print(f"{elapsed:.2f} s", coalescing_stats())
@@ -0,0 +1,5 @@
+import os
+
+# Settings are read when src.config is imported and require Notion credentials
+os.environ.setdefault("NOTION_TOKEN", "test-token")
+os.environ.setdefault("NOTION_DATABASE_ID", "0123456789abcdef0123456789abcdef")
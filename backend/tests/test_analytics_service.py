@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+from src.services.analytics_service import ExpenseQueryParser
+
+TODAY = date(2026, 10, 19)
+
+@pytest.fixture(scope="module")
+def parser():
+    return ExpenseQueryParser()
+
+@pytest.mark.parametrize("text", [
+    "how much did I spend on uber in march?",
+    "how many coffees last 30 days",
+    "total food last month",
+    "total food last 30 days",
+    "breakdown by category this year",
+    "food last month?",
+    "what did I spend in 2024",
+    "total spend march 2024",
+])
+def test_questions_are_queries(parser, text):
+    assert parser.is_query(text)
+
+@pytest.mark.parametrize("text", [
+    "show tickets 400",
+    "what a burger 300",
+    "total recall movie 300",
+    "coffee 50?",
+    "list price shoes ₹2,000",
+    "uber ride 150 need today",
+])
+def test_expenses_with_an_amount_are_not_queries(parser, text):
+    assert not parser.is_query(text)
+
+def test_month_with_explicit_year(parser):
+    query = parser.parse("total spend march 2024", TODAY)
+    assert (query["start_date"], query["end_date"]) == (date(2024, 3, 1), date(2024, 3, 31))
+    assert query["period"] == "in March 2024"
+
+def test_whole_year(parser):
+    query = parser.parse("how much did I spend on food in 2024", TODAY)
+    assert (query["start_date"], query["end_date"], query["category"]) == (date(2024, 1, 1), date(2024, 12, 31), "food")
+
+def test_category_synonyms(parser):
+    query = parser.parse("total bills last month", TODAY)
+    assert (query["category"], query["name_query"]) == ("bills & utilities", "")
+    assert parser.parse("how much on groceries this month", TODAY)["category"] == "groceries"
+
+def test_synonym_that_names_past_expenses_stays_a_name_search(parser):
+    query = parser.parse("how much on uber this month", TODAY, is_name=lambda token: token == "uber")
+    assert (query["category"], query["name_query"]) == (None, "uber")
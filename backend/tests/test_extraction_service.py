@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+from src.services.extraction_service import extract
+from src.services.nlp_service import ExpenseNLPService
+
+TODAY = date(2024, 7, 19)  # a Friday
+
+# (text, expected assigned_date, expected amount) relative to Friday 2024-07-19
+CORPUS = [
+    ("coffee food 50 want today", "2024-07-19", 50.0),
+    ("snacks food 200 essential yesterday", "2024-07-18", 200.0),
+    ("uber ride 150 need tomorrow", "2024-07-20", 150.0),
+    ("lunch 250 day before yesterday", "2024-07-17", 250.0),
+    ("movie 500 day after tomorrow", "2024-07-21", 500.0),
+    ("dinner 800 2 days ago", "2024-07-17", 800.0),
+    ("dinner 800 two days ago", "2024-07-17", 800.0),
+    ("gym 1500 a week ago", "2024-07-12", 1500.0),
+    ("rent 20000 3 weeks ago", "2024-06-28", 20000.0),
+    ("petrol 2000 last friday", "2024-07-12", 2000.0),
+    ("petrol 2000 on friday", "2024-07-19", 2000.0),
+    ("petrol 2000 friday", "2024-07-19", 2000.0),
+    ("pizza 600 last saturday", "2024-07-13", 600.0),
+    ("pizza 600 this monday", "2024-07-15", 600.0),
+    ("pizza 600 last sun", "2024-07-14", 600.0),
+    ("sun glasses 900", None, 900.0),
+    ("haircut general 300 need 15 july", "2024-07-15", 300.0),
+    ("haircut 300 15th july", "2024-07-15", 300.0),
+    ("haircut 300 1st of july", "2024-07-01", 300.0),
+    ("haircut 300 july 15", "2024-07-15", 300.0),
+    ("haircut 300 july 15th, 2023", "2023-07-15", 300.0),
+    ("haircut 300 15 jul 2023", "2023-07-15", 300.0),
+    ("books 450 28 dec", "2023-12-28", 450.0),
+    ("books 450 sept 3", "2023-09-03", 450.0),
+    ("books 450 2024-03-09", "2024-03-09", 450.0),
+    ("books 450 09/03/2024", "2024-03-09", 450.0),
+    ("books 450 09-03-24", "2024-03-09", 450.0),
+    ("books 450 9/3", "2024-03-09", 450.0),
+    ("books 450 31 feb", None, 450.0),
+    ("2 coffees 300", None, 300.0),
+    ("3 movie tickets 750 yesterday", "2024-07-18", 750.0),
+    ("uber 150 2 people", None, 150.0),
+    ("paid 500 for 2 pizzas", None, 500.0),
+    ("₹300 coffee", None, 300.0),
+    ("coffee ₹ 300", None, 300.0),
+    ("coffee rs 300", None, 300.0),
+    ("coffee rs.300", None, 300.0),
+    ("coffee inr 300", None, 300.0),
+    ("coffee 300 rs", None, 300.0),
+    ("coffee 300 rupees", None, 300.0),
+    ("coffee 300/-", None, 300.0),
+    ("2 coffees ₹300", None, 300.0),
+    ("phone ₹1.5k", None, 1500.0),
+    ("laptop 75k", None, 75000.0),
+    ("laptop 75 k", None, 75000.0),
+    ("car 2.5 lakh", None, 250000.0),
+    ("tv ₹1,20,000", None, 120000.0),
+    ("tv 1,499.50", None, 1499.5),
+    ("coffee 12.50", None, 12.5),
+    ("had coffee for 300.", None, 300.0),
+    ("groceries 1200 essential 15 july icici cc", "2024-07-15", 1200.0),
+    ("electricity bill 2500 essential indusind cc", None, 2500.0),
+    ("iphone15 case 999", None, 999.0),
+    ("zomato 2 km away 300", None, 300.0),
+    ("netflix 649 subscription", None, 649.0),
+    ("tea 20 tonight", "2024-07-19", 20.0),
+    ("tea 20 yday", "2024-07-18", 20.0),
+    ("tea", None, None),
+    ("12 eggs", None, 12.0),
+    ("lunch 250 on 5 july", "2024-07-05", 250.0),
+    ("lunch 250 5 days ago hdfc cc", "2024-07-14", 250.0),
+    ("electricity 2500 june 2024", "2024-06-01", 2500.0),
+    ("netflix 649 may 2024", "2024-05-01", 649.0),
+    ("sip 5000 jan 2025", "2025-01-01", 5000.0),
+    ("rent 15000 march, 2024", "2024-03-01", 15000.0),
+    ("books 450 31 feb 2024", None, 450.0),
+    ("june 2024 electricity 2500", "2024-06-01", 2500.0),
+]
+
+@pytest.mark.parametrize("text,expected_date,expected_amount", CORPUS)
+def test_extract(text, expected_date, expected_amount):
+    result = extract(text, TODAY)
+    assert (result["assigned_date"], result["amount"]) == (expected_date, expected_amount)
+
+def test_month_year_is_a_date_not_an_amount():
+    expense = ExpenseNLPService().parse_expense("electricity bill 2500 june 2024", TODAY)
+    assert (expense.amount, expense.assigned_date, expense.expense_name) == (2500.0, "2024-06-01", "electricity bill")
+
+def test_parse_defaults_to_given_today():
+    expense = ExpenseNLPService().parse_expense("tea 20", TODAY)
+    assert expense.assigned_date == "2024-07-19"
+
+@pytest.mark.parametrize("text", ["smartwatch 2000", "business trip 500", "automatic watch 3000"])
+def test_keyword_inside_word_is_not_confident(text):
+    assert ExpenseNLPService().resolve_locally(text, TODAY) is None
+
+@pytest.mark.parametrize("text", ["bus 40", "business lunch 500", "pizza 300 yesterday"])
+def test_whole_word_keyword_is_confident(text):
+    assert ExpenseNLPService().resolve_locally(text, TODAY) is not None
@@ -0,0 +1,63 @@
+import pytest
+
+from src.models import ExpenseCategory, BankAccount
+from src.records import ExpenseRecord, CATEGORY_CODES, BANK_ACCOUNT_CODES, to_epoch_day
+from src.services.search_service import ExpenseSearchIndex
+
+FOOD = CATEGORY_CODES[ExpenseCategory.FOOD.value]
+COMMUTE = CATEGORY_CODES[ExpenseCategory.COMMUTE.value]
+HDFC = BANK_ACCOUNT_CODES[BankAccount.HDFC.value]
+IND = BANK_ACCOUNT_CODES[BankAccount.IND.value]
+
+EXPENSES = [
+    ("uber to office", 250.0, "2024-03-02", COMMUTE, HDFC),
+    ("coffee", 120.0, "2024-03-05", FOOD, IND),
+    ("uber airport", 900.0, "2024-01-15", COMMUTE, IND),
+    ("lunch coffee", 340.0, "2024-03-05", FOOD, HDFC),
+    ("uber home", 180.0, "2024-04-01", COMMUTE, HDFC),
+]
+
+@pytest.fixture(scope="module")
+def index():
+    index = ExpenseSearchIndex()
+    for name, amount, day, category, account in EXPENSES:
+        index.add(ExpenseRecord(name, amount, to_epoch_day(day), category, 0, account, 1))
+    return index
+
+def names(result):
+    return [record.name for record in result["results"]]
+
+def test_tokens_match_newest_first(index):
+    result = index.search("uber")
+    assert names(result) == ["uber home", "uber airport", "uber to office"]
+    assert (result["total_matches"], result["total_amount"]) == (3, 1330.0)
+
+def test_every_token_must_match(index):
+    assert names(index.search("coffee lunch")) == ["lunch coffee"]
+    assert index.search("uber coffee")["total_matches"] == 0
+
+def test_fuzzy_expansion(index):
+    result = index.search("cofee")
+    assert result["expanded_tokens"] == {"cofee": ["coffee"]}
+    assert names(result) == ["lunch coffee", "coffee"]
+
+def test_date_bounds_are_inclusive(index):
+    result = index.search("", "2024-03-02", "2024-03-05")
+    assert names(result) == ["lunch coffee", "coffee", "uber to office"]
+    assert result["total_amount"] == 710.0
+    assert names(index.search("uber", start_date="2024-03-01")) == ["uber home", "uber to office"]
+    assert names(index.search("uber", end_date="2024-03-01")) == ["uber airport"]
+
+def test_inverted_date_range_matches_nothing(index):
+    result = index.search("", "2024-04-01", "2024-01-01")
+    assert (result["total_matches"], result["total_amount"], result["results"]) == (0, 0, [])
+
+def test_category_and_account_filters(index):
+    assert names(index.search(category=ExpenseCategory.FOOD, bank_account=BankAccount.HDFC)) == ["lunch coffee"]
+    assert names(index.search("uber", end_date="2024-03-31", bank_account=BankAccount.IND)) == ["uber airport"]
+
+def test_limit_keeps_totals(index):
+    result = index.search(limit=2)
+    assert names(result) == ["uber home", "lunch coffee"]
+    assert (result["total_matches"], result["total_amount"]) == (5, 1790.0)
+    assert index.search("", "2024-03-01", limit=1)["total_matches"] == 4
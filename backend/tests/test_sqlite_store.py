@@ -0,0 +1,104 @@
+import pytest
+
+from src.models import ExpenseData
+from src.services.sqlite_store import SQLiteExpenseStore
+
+COFFEE = {
+    "expense_name": "coffee",
+    "category": "food",
+    "amount": 120.0,
+    "importance": "want",
+    "bank_account": "HDFC",
+    "assigned_date": "2024-03-05",
+    "expense_type": "expense",
+}
+EDITED = "2024-03-05T10:15:00.000Z"
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteExpenseStore(str(tmp_path / "expenses.db"))
+
+@pytest.fixture
+def seen(store):
+    seen = []
+    store.subscribe(lambda record: seen.append(record.name))
+    return seen
+
+def expense(**changes):
+    return ExpenseData(**{**COFFEE, **changes})
+
+def rows(store):
+    return [row["expense_name"] for row in store.iter_rows()]
+
+def test_lost_push_is_linked_by_local_id(store, seen):
+    expense_id = store.add(expense())
+    store.mark_failed(expense_id, "timeout", 0)
+    assert store.apply_remote("page-a", "url", EDITED, COFFEE, expense_id) == "linked"
+    assert store.sync_status()["pending"] == 0
+    assert (rows(store), seen) == (["coffee"], ["coffee"])
+
+def test_lost_push_is_linked_by_values_without_local_id(store):
+    expense_id = store.add(expense())
+    # Never attempted: a page with the same values is another expense
+    assert store.apply_remote("page-a", "url", EDITED, COFFEE) == "imported"
+    store.mark_failed(expense_id, "timeout", 0)
+    assert store.apply_remote("page-b", "url", EDITED, COFFEE) == "linked"
+    assert rows(store) == ["coffee", "coffee"]
+
+def test_second_page_for_a_linked_row_is_a_duplicate(store, seen):
+    expense_id = store.add(expense())
+    store.mark_synced(expense_id, "page-b", "url", EDITED)
+    assert store.apply_remote("page-a", "url", EDITED, COFFEE, expense_id) == "duplicate"
+    # Pulled again while the cursor sits on the same edit time
+    assert store.apply_remote("page-a", "url", EDITED, COFFEE, expense_id) == "unchanged"
+    assert (rows(store), seen) == (["coffee"], ["coffee"])
+    [conflict] = store.conflicts()
+    assert (conflict["expense_id"], conflict["notion_page_id"], conflict["resolution"]) == (expense_id, "page-a", "duplicate")
+
+def test_notion_edit_wins_and_keeps_the_local_version(store):
+    expense_id = store.add(expense())
+    store.mark_synced(expense_id, "page-a", "url", EDITED)
+    assert store.apply_remote("page-a", "url", "2024-03-05T11:00:00.000Z", {**COFFEE, "amount": 150.0}) == "updated"
+    assert [row["amount"] for row in store.iter_rows()] == [150.0]
+    [conflict] = store.conflicts()
+    assert (conflict["local_version"]["amount"], conflict["notion_version"]["amount"]) == (120.0, 150.0)
+    assert conflict["resolution"] == "notion_applied"
+
+def test_edit_within_the_same_minute_is_applied(store):
+    expense_id = store.add(expense())
+    store.mark_synced(expense_id, "page-a", "url", EDITED)
+    assert store.apply_remote("page-a", "url", EDITED, COFFEE) == "unchanged"
+    assert store.apply_remote("page-a", "url", EDITED, {**COFFEE, "amount": 130.0}) == "updated"
+    assert store.apply_remote("page-a", "url", "2024-03-05T10:14:00.000Z", {**COFFEE, "amount": 1.0}) == "unchanged"
+    assert [row["amount"] for row in store.iter_rows()] == [130.0]
+
+def test_page_created_in_notion_is_imported(store, seen):
+    assert store.apply_remote("page-a", "url", EDITED, {**COFFEE, "expense_name": "lunch"}, 99) == "imported"
+    assert (rows(store), seen) == (["lunch"], ["lunch"])
+    assert store.sync_status()["synced"] == 1
+
+def test_replay_catches_up_on_rows_added_meanwhile(store):
+    store.add(expense(expense_name="first"))
+    store.add(expense(expense_name="second"))
+    replayed = []
+
+    def listener(record):
+        replayed.append(record.name)
+        if record.name == "first":
+            store.add(expense(expense_name="third"))
+
+    assert store.replace_listeners([listener], replay=True)
+    store.add(expense(expense_name="fourth"))
+    assert replayed == ["first", "second", "third", "fourth"]
+
+def test_replay_is_abandoned_when_a_row_is_edited_meanwhile(store, seen):
+    expense_id = store.add(expense())
+    store.mark_synced(expense_id, "page-a", "url", EDITED)
+
+    def listener(record):
+        store.apply_remote("page-a", "url", "2024-03-05T11:00:00.000Z", {**COFFEE, "amount": 150.0})
+
+    assert not store.replace_listeners([listener], replay=True)
+    # The previous listeners stay in place
+    store.add(expense(expense_name="lunch"))
+    assert seen == ["coffee", "lunch"]